@@ -10,13 +10,15 @@ Diagram types generated per paper:
   3. Model / Research Pipeline
   4. Data Flow Diagram
 
-For PDF embedding, renders diagrams via mermaid.ink API.
+For PDF embedding, renders diagrams via mermaid.ink API (concurrently).
 """
 
 import os
 import re
 import base64
+import asyncio
 import httpx
+from pathlib import Path
 from dotenv import load_dotenv
 
 from langchain_groq import ChatGroq
@@ -282,12 +284,20 @@ def regenerate_single_diagram(summary: str, methodology: str, paper_type: str, d
     }
 
 
-def render_diagram_to_png(mermaid_code: str, output_path: str) -> bool:
+def _write_png(output_path: str, data: bytes):
+    """Create the parent directory and write the PNG (run in a worker thread)."""
+    path = Path(output_path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+
+
+async def render_diagram_to_png(mermaid_code: str, output_path: str, client: httpx.AsyncClient) -> bool:
     """Render a Mermaid diagram to PNG using mermaid.ink API.
 
     Args:
         mermaid_code: Valid Mermaid diagram code
         output_path: Path to save the PNG file
+        client: Shared async HTTP client (lets several renders run concurrently)
 
     Returns:
         True if successful, False otherwise
@@ -296,11 +306,9 @@ def render_diagram_to_png(mermaid_code: str, output_path: str) -> bool:
         encoded = base64.urlsafe_b64encode(mermaid_code.encode("utf-8")).decode("utf-8")
         url = f"https://mermaid.ink/img/base64:{encoded}"
 
-        response = httpx.get(url, timeout=30)
+        response = await client.get(url, timeout=30)
         if response.status_code == 200 and len(response.content) > 100:
-            os.makedirs(os.path.dirname(output_path), exist_ok=True)
-            with open(output_path, "wb") as f:
-                f.write(response.content)
+            await asyncio.to_thread(_write_png, output_path, response.content)
             print(f"[DIAGRAM AGENT] Rendered PNG: {output_path}")
             return True
         else:
@@ -309,3 +317,17 @@ def render_diagram_to_png(mermaid_code: str, output_path: str) -> bool:
     except Exception as e:
         print(f"[DIAGRAM AGENT] PNG render failed: {e}")
         return False
+
+
+async def render_diagrams_to_png(mermaid_codes: list[str], output_paths: list[str]) -> list[bool]:
+    """Render several Mermaid diagrams concurrently.
+    Total wall-clock time is roughly that of the slowest render, not the sum.
+
+    Returns:
+        One success flag per diagram, in input order
+    """
+    async with httpx.AsyncClient() as client:
+        return await asyncio.gather(*(
+            render_diagram_to_png(code, path, client)
+            for code, path in zip(mermaid_codes, output_paths)
+        ))
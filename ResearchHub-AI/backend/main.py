@@ -6,11 +6,19 @@ from contextlib import asynccontextmanager
 import re
 import os
 import threading
+import logging
 import traceback
 from utils.database import init_db
-from utils.vector_store import init_vector_store
+from utils.vector_store import init_vector_store, shutdown_embed_pool
+from utils import groq_client
 from routers import auth, papers, workspaces, chat, storyboard, audio, latex
 
+# LLM clients log per-call details at DEBUG; set LOG_LEVEL=DEBUG to see them
+logging.basicConfig(
+    level=os.getenv("LOG_LEVEL", "INFO").upper(),
+    format="%(asctime)s %(levelname)s %(name)s: %(message)s",
+)
+
 # Accept any localhost origin (Vite dev) or Docker internal origins
 ALLOWED_ORIGIN_RE = re.compile(r"^http://(localhost|frontend|127\.0\.0\.1)(:\d+)?$")
 
@@ -35,6 +43,9 @@ async def lifespan(app: FastAPI):
     thread = threading.Thread(target=_preload_vector_store, daemon=True)
     thread.start()
     yield
+    await papers.close_http_client()
+    await groq_client.close_http_client()
+    shutdown_embed_pool()
 
 
 app = FastAPI(title="ResearchHub AI API", version="1.0.0", lifespan=lifespan)
@@ -45,6 +56,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Audio-Url"],  # read by the frontend after /api/audio/stream
 )
 
 
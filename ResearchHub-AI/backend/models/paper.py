@@ -18,3 +18,7 @@ class Paper(Base):
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     workspace_id = Column(Integer, ForeignKey("workspaces.id"), nullable=False)
     imported_at = Column(DateTime, server_default=func.now())
+
+    # Fetch server defaults via INSERT ... RETURNING so callers can read them
+    # right after flush() without a follow-up refresh/SELECT
+    __mapper_args__ = {"eager_defaults": True}
@@ -11,3 +11,7 @@ class Workspace(Base):
     description = Column(Text, nullable=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     created_at = Column(DateTime, server_default=func.now())
+
+    # Fetch server defaults via INSERT ... RETURNING so callers can read them
+    # right after flush() without a follow-up refresh/SELECT
+    __mapper_args__ = {"eager_defaults": True}
@@ -6,19 +6,20 @@ Generates MP3 narration from a workspace's existing summary.
 The summary is retrieved from internal sources (conversation history
 or the visual summary pipeline) — the user does NOT send any text.
 
-Endpoint:
+Endpoints:
     POST /api/audio/generate/{workspace_id}
+    POST /api/audio/stream/{workspace_id}
 """
 
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
 from sqlalchemy import select, desc
 from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
 
 from utils.database import get_db
-from utils.auth_utils import get_current_user
-from utils.audio_generator import generate_audio
-from models.user import User
+from utils.auth_utils import AuthenticatedUser, get_current_user
+from utils.audio_generator import generate_audio, stream_audio
 from models.workspace import Workspace
 from models.paper import Paper
 from models.conversation import Conversation
@@ -83,19 +84,12 @@ async def _get_workspace_summary(db: AsyncSession, workspace_id: int, user_id: i
     return None
 
 
-@router.post("/generate/{workspace_id}", response_model=AudioResponse)
-async def generate_audio_summary(
-    workspace_id: int,
-    db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user),
-):
-    """Generate an MP3 audio narration from the workspace's existing summary."""
-
-    # Verify workspace belongs to user
+async def _require_workspace_summary(db: AsyncSession, workspace_id: int, user_id: int) -> str:
+    """Verify workspace ownership and return its summary, raising HTTP errors otherwise."""
     ws_result = await db.execute(
         select(Workspace).where(
             Workspace.id == workspace_id,
-            Workspace.user_id == current_user.id,
+            Workspace.user_id == user_id,
         )
     )
     workspace = ws_result.scalar_one_or_none()
@@ -103,13 +97,24 @@ async def generate_audio_summary(
         raise HTTPException(status_code=404, detail="Workspace not found")
 
     # Retrieve summary from internal sources
-    summary = await _get_workspace_summary(db, workspace_id, current_user.id)
+    summary = await _get_workspace_summary(db, workspace_id, user_id)
     if not summary:
         raise HTTPException(
             status_code=400,
             detail="No summary available for this workspace. "
                    "Please chat with your papers or run the Summarize tool first.",
         )
+    return summary
+
+
+@router.post("/generate/{workspace_id}", response_model=AudioResponse)
+async def generate_audio_summary(
+    workspace_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: AuthenticatedUser = Depends(get_current_user),
+):
+    """Generate an MP3 audio narration from the workspace's existing summary."""
+    summary = await _require_workspace_summary(db, workspace_id, current_user.id)
 
     # Generate audio
     try:
@@ -123,3 +128,29 @@ async def generate_audio_summary(
         audio_url=audio_url,
         message="Audio summary generated successfully",
     )
+
+
+@router.post("/stream/{workspace_id}")
+async def stream_audio_summary(
+    workspace_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: AuthenticatedUser = Depends(get_current_user),
+):
+    """Stream the MP3 narration while edge-tts is still synthesising it.
+
+    The finished file is also saved; its URL is returned in the X-Audio-Url header.
+    """
+    summary = await _require_workspace_summary(db, workspace_id, current_user.id)
+
+    try:
+        audio_url, chunks = await stream_audio(summary, workspace_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Audio generation failed: {str(e)}")
+
+    return StreamingResponse(
+        chunks,
+        media_type="audio/mpeg",
+        headers={"X-Audio-Url": audio_url},
+    )
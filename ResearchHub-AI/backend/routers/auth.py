@@ -3,7 +3,7 @@ from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
 from utils.database import get_db
-from utils.auth_utils import hash_password, verify_password, create_access_token
+from utils.auth_utils import hash_password_async, verify_password_async, create_access_token
 from models.user import User
 
 router = APIRouter()
@@ -44,11 +44,11 @@ async def register(body: UserCreate, db: AsyncSession = Depends(get_db)):
     user = User(
         email=body.email,
         username=body.username,
-        hashed_password=hash_password(body.password),
+        # bcrypt runs in a worker thread (see hash_password_async)
+        hashed_password=await hash_password_async(body.password),
     )
     db.add(user)
     await db.flush()
-    await db.refresh(user)
     return {"message": "User registered successfully"}
 
 
@@ -57,13 +57,14 @@ async def login(body: UserLogin, db: AsyncSession = Depends(get_db)):
     result = await db.execute(select(User).where(User.email == body.email))
     user = result.scalar_one_or_none()
 
-    if not user or not verify_password(body.password, user.hashed_password):
+    # bcrypt runs in a worker thread (see verify_password_async)
+    if not user or not await verify_password_async(body.password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid email or password",
         )
 
-    token = create_access_token({"sub": user.email})
+    token = create_access_token({"sub": user.email, "uid": user.id})
     return {
         "access_token": token,
         "token_type": "bearer",
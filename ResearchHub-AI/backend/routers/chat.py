@@ -1,14 +1,14 @@
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
 
-from utils.database import get_db
-from utils.auth_utils import get_current_user
-from utils.research_assistant import ResearchAssistant
+from utils.database import get_db, get_db_ctx
+from utils.auth_utils import AuthenticatedUser, get_current_user
+from utils.research_assistant import ResearchAssistant, SUMMARY_QUERY_HINT
 from utils.groq_client import QuotaExceededError, get_groq_browser_search_response
 from utils import vector_store
-from models.user import User
 from models.workspace import Workspace
 from models.paper import Paper
 from models.conversation import Conversation
@@ -31,59 +31,36 @@ class ToolRequest(BaseModel):
     workspace_id: int
 
 
-# ---------- Endpoints ----------
+# ---------- Helpers ----------
 
-@router.post("")
-async def chat(
-    body: ChatMessage,
-    db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user),
-):
-    # Verify workspace belongs to user
+async def _require_workspace(db: AsyncSession, workspace_id: int, user_id: int) -> Workspace:
+    """Return the workspace if it belongs to the user, else 404."""
     ws_result = await db.execute(
         select(Workspace).where(
-            Workspace.id == body.workspace_id,
-            Workspace.user_id == current_user.id,
+            Workspace.id == workspace_id,
+            Workspace.user_id == user_id,
         )
     )
     workspace = ws_result.scalar_one_or_none()
     if not workspace:
         raise HTTPException(status_code=404, detail="Workspace not found")
+    return workspace
 
-    # --- Deep Research Mode: use Groq browser_search ---
-    if body.web_search:
-        try:
-            ai_text = get_groq_browser_search_response(body.message)
-        except QuotaExceededError as e:
-            raise HTTPException(status_code=429, detail=str(e))
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=f"Web search failed: {str(e)}")
-
-        # Store conversation
-        conversation = Conversation(
-            workspace_id=body.workspace_id,
-            user_id=current_user.id,
-            user_message=body.message,
-            ai_response=ai_text,
-            is_web_search=True,
-        )
-        db.add(conversation)
-        await db.flush()
-
-        return {"response": ai_text, "is_web_search": True}
 
-    # --- Standard Mode: paper-context RAG with Llama 3.3 70B ---
-    # Fetch papers — only selected ones if paper_ids provided, else all in workspace
+async def _build_research_context(db: AsyncSession, body: ChatMessage, assistant: ResearchAssistant) -> str:
+    """Fetch the chat's papers, retrieve relevant chunks, and build the RAG prompt context."""
+    # Fetch papers — only selected ones if paper_ids provided, else all in workspace.
+    # Ordered by id so the same paper set always yields the same prompt (and cache key).
     if body.paper_ids:
         papers_result = await db.execute(
             select(Paper).where(
                 Paper.id.in_(body.paper_ids),
                 Paper.workspace_id == body.workspace_id,
-            )
+            ).order_by(Paper.id)
         )
     else:
         papers_result = await db.execute(
-            select(Paper).where(Paper.workspace_id == body.workspace_id)
+            select(Paper).where(Paper.workspace_id == body.workspace_id).order_by(Paper.id)
         )
     papers = papers_result.scalars().all()
 
@@ -92,18 +69,53 @@ async def chat(
     retrieved_chunks = {}
     if paper_ids_with_content:
         try:
-            retrieved_chunks = vector_store.query_papers(
+            retrieved_chunks = await vector_store.query_papers(
                 paper_ids_with_content, body.message, n_results=5
             )
         except Exception as e:
             print(f"[WARNING] Vector retrieval failed: {e}")
 
-    # Build context and generate response
+    return assistant.create_research_context(papers, body.message, retrieved_chunks)
+
+
+# ---------- Endpoints ----------
+
+@router.post("")
+async def chat(
+    body: ChatMessage,
+    db: AsyncSession = Depends(get_db),
+    current_user: AuthenticatedUser = Depends(get_current_user),
+):
+    await _require_workspace(db, body.workspace_id, current_user.id)
+
+    # --- Deep Research Mode: use Groq browser_search ---
+    if body.web_search:
+        try:
+            ai_text = await get_groq_browser_search_response(body.message)
+        except QuotaExceededError as e:
+            raise HTTPException(status_code=429, detail=str(e))
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Web search failed: {str(e)}")
+
+        # Store conversation
+        conversation = Conversation(
+            workspace_id=body.workspace_id,
+            user_id=current_user.id,
+            user_message=body.message,
+            ai_response=ai_text,
+            is_web_search=True,
+        )
+        db.add(conversation)
+        await db.flush()
+
+        return {"response": ai_text, "is_web_search": True}
+
+    # --- Standard Mode: paper-context RAG with Llama 3.3 70B ---
     assistant = ResearchAssistant()
-    context = assistant.create_research_context(papers, body.message, retrieved_chunks)
+    context = await _build_research_context(db, body, assistant)
 
     try:
-        ai_text = assistant.generate_research_response(context, body.message)
+        ai_text = await assistant.generate_research_response(context, body.message)
     except QuotaExceededError as e:
         raise HTTPException(status_code=429, detail=str(e))
     except Exception as e:
@@ -123,11 +135,57 @@ async def chat(
     return {"response": ai_text, "is_web_search": False}
 
 
+@router.post("/stream")
+async def chat_stream(
+    body: ChatMessage,
+    db: AsyncSession = Depends(get_db),
+    current_user: AuthenticatedUser = Depends(get_current_user),
+):
+    """Paper-context chat that streams the answer as plain text while it is generated.
+    The conversation is stored once the stream completes. Web search is not streamed."""
+    if body.web_search:
+        raise HTTPException(status_code=400, detail="Web search responses are not streamed; use POST /api/chat")
+
+    await _require_workspace(db, body.workspace_id, current_user.id)
+
+    assistant = ResearchAssistant()
+    context = await _build_research_context(db, body, assistant)
+    tokens = assistant.stream_research_response(context, body.message)
+
+    # Pull the first delta before responding so quota / API errors still map to status codes
+    try:
+        first = await anext(tokens, "")
+    except QuotaExceededError as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"AI generation failed: {str(e)}")
+
+    async def relay():
+        parts = [first]
+        yield first
+        async for delta in tokens:
+            parts.append(delta)
+            yield delta
+
+        # Store conversation in a fresh session: the request-scoped one may
+        # already be closed once the response body is being sent
+        async with get_db_ctx() as stream_db:
+            stream_db.add(Conversation(
+                workspace_id=body.workspace_id,
+                user_id=current_user.id,
+                user_message=body.message,
+                ai_response="".join(parts),
+                is_web_search=False,
+            ))
+
+    return StreamingResponse(relay(), media_type="text/plain; charset=utf-8")
+
+
 @router.get("/history/{workspace_id}")
 async def get_chat_history(
     workspace_id: int,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: AuthenticatedUser = Depends(get_current_user),
 ):
     # Verify workspace belongs to user
     ws_result = await db.execute(
@@ -168,7 +226,7 @@ async def get_chat_history(
 async def run_ai_tool(
     body: ToolRequest,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: AuthenticatedUser = Depends(get_current_user),
 ):
     """Run a specific AI tool on selected papers only — uses minimal context."""
     # Verify workspace
@@ -186,7 +244,7 @@ async def run_ai_tool(
         select(Paper).where(
             Paper.id.in_(body.paper_ids),
             Paper.workspace_id == body.workspace_id,
-        )
+        ).order_by(Paper.id)
     )
     papers = papers_result.scalars().all()
     if not papers:
@@ -199,11 +257,11 @@ async def run_ai_tool(
         try:
             # Use tool name as query context for better retrieval
             query_hint = {
-                "summarize": f"summarize the key points and contributions of this paper",
+                "summarize": SUMMARY_QUERY_HINT,
                 "compare": "compare methodologies, findings, similarities and differences",
                 "findings": "key findings, results, conclusions, contributions",
             }.get(body.tool, body.tool)
-            retrieved_chunks = vector_store.query_papers(
+            retrieved_chunks = await vector_store.query_papers(
                 paper_ids_with_content, query_hint, n_results=20
             )
         except Exception as e:
@@ -212,14 +270,13 @@ async def run_ai_tool(
     assistant = ResearchAssistant()
     try:
         if body.tool == "summarize":
-            chunks_for_paper = retrieved_chunks.get(papers[0].id)
-            ai_text = assistant.summarize_paper(papers[0], chunks_for_paper)
+            ai_text = await assistant.summarize_papers(papers, retrieved_chunks)
         elif body.tool == "compare":
             if len(papers) < 2:
                 raise HTTPException(status_code=400, detail="Need at least 2 papers to compare")
-            ai_text = assistant.compare_papers(papers, retrieved_chunks)
+            ai_text = await assistant.compare_papers(papers, retrieved_chunks)
         elif body.tool == "findings":
-            ai_text = assistant.extract_key_findings(papers, retrieved_chunks)
+            ai_text = await assistant.extract_key_findings(papers, retrieved_chunks)
         else:
             raise HTTPException(status_code=400, detail=f"Unknown tool: {body.tool}")
     except QuotaExceededError as e:
@@ -18,9 +18,8 @@ from pydantic import BaseModel
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from models.user import User
 from models.workspace import Workspace
-from utils.auth_utils import get_current_user
+from utils.auth_utils import AuthenticatedUser, get_current_user
 from utils.database import get_db
 from utils.latex_compiler import (
     compile_latex,
@@ -38,7 +37,7 @@ router = APIRouter()
 
 # ── helpers ────────────────────────────────
 
-async def _verify_workspace(workspace_id: int, user: User, db: AsyncSession) -> Workspace:
+async def _verify_workspace(workspace_id: int, user: AuthenticatedUser, db: AsyncSession) -> Workspace:
     """Ensure the workspace exists and belongs to the current user."""
     result = await db.execute(
         select(Workspace).where(Workspace.id == workspace_id, Workspace.user_id == user.id)
@@ -71,7 +70,7 @@ class ApplyTemplateRequest(BaseModel):
 @router.get("/files/{workspace_id}")
 async def list_files(
     workspace_id: int,
-    user: User = Depends(get_current_user),
+    user: AuthenticatedUser = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
     await _verify_workspace(workspace_id, user, db)
@@ -82,7 +81,7 @@ async def list_files(
 async def get_file(
     workspace_id: int,
     name: str = Query("main.tex"),
-    user: User = Depends(get_current_user),
+    user: AuthenticatedUser = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
     await _verify_workspace(workspace_id, user, db)
@@ -94,7 +93,7 @@ async def get_file(
 async def save_file(
     workspace_id: int,
     body: SaveFileRequest,
-    user: User = Depends(get_current_user),
+    user: AuthenticatedUser = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
     await _verify_workspace(workspace_id, user, db)
@@ -106,7 +105,7 @@ async def save_file(
 async def remove_file(
     workspace_id: int,
     name: str = Query(...),
-    user: User = Depends(get_current_user),
+    user: AuthenticatedUser = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
     await _verify_workspace(workspace_id, user, db)
@@ -119,7 +118,7 @@ async def remove_file(
 @router.post("/compile/{workspace_id}", response_model=CompileResponse)
 async def compile(
     workspace_id: int,
-    user: User = Depends(get_current_user),
+    user: AuthenticatedUser = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
     await _verify_workspace(workspace_id, user, db)
@@ -131,7 +130,7 @@ async def compile(
 @router.get("/pdf/{workspace_id}")
 async def download_pdf(
     workspace_id: int,
-    user: User = Depends(get_current_user),
+    user: AuthenticatedUser = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
     await _verify_workspace(workspace_id, user, db)
@@ -142,7 +141,7 @@ async def download_pdf(
 
 
 @router.get("/templates")
-async def list_templates(user: User = Depends(get_current_user)):
+async def list_templates(user: AuthenticatedUser = Depends(get_current_user)):
     return {"templates": list(TEMPLATES.keys())}
 
 
@@ -150,7 +149,7 @@ async def list_templates(user: User = Depends(get_current_user)):
 async def apply_template(
     workspace_id: int,
     body: ApplyTemplateRequest,
-    user: User = Depends(get_current_user),
+    user: AuthenticatedUser = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
     await _verify_workspace(workspace_id, user, db)
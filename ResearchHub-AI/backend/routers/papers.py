@@ -1,9 +1,12 @@
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, BackgroundTasks
 from fastapi.responses import Response
-from sqlalchemy import select
+from sqlalchemy import select, insert
 from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
 from typing import Optional
+from types import SimpleNamespace
+import os
+import asyncio
 import httpx
 import PyPDF2
 import io
@@ -12,9 +15,9 @@ import xml.etree.ElementTree as ET
 from collections import Counter
 
 from utils.database import get_db
-from utils.auth_utils import get_current_user
+from utils.auth_utils import get_current_user_id
 from utils import vector_store
-from models.user import User
+from utils.research_assistant import ResearchAssistant, SUMMARY_QUERY_HINT
 from models.paper import Paper
 from models.workspace import Workspace
 
@@ -27,6 +30,19 @@ _NS = {
     "opensearch": "http://a9.com/-/spec/opensearch/1.1/",
 }
 
+# Shared HTTP client — keeps TLS sessions / connection pool warm across requests.
+# Closed from the app lifespan via close_http_client().
+_http = httpx.AsyncClient(
+    timeout=30.0,
+    follow_redirects=True,
+    limits=httpx.Limits(max_connections=50, max_keepalive_connections=20),
+)
+
+
+async def close_http_client():
+    """Close the shared HTTP client (called on app shutdown)."""
+    await _http.aclose()
+
 
 # ---------- Pydantic schemas ----------
 
@@ -43,32 +59,93 @@ class PaperImport(BaseModel):
 
 # ---------- Helpers ----------
 
-def _embed_paper_background(paper_id: int, content: str):
+# Uploaded PDFs whose extracted text falls below these are treated as scanned/
+# image-only and not embedded (a few dozen junk chars aren't worth a model pass)
+_MIN_EMBED_CHARS = 500
+_MIN_EMBED_DISTINCT_CHARS = 30  # cheap entropy proxy
+# Cap on text fed to the embedder — bounds worst-case ingestion time
+_MAX_EMBED_CHARS = 1_000_000
+# Batch import limits: papers per request, and PDFs fetched / parsed at once
+# (shared by all requests, so one big import can't starve the HTTP pool or threads)
+_MAX_BATCH_IMPORT = 50
+_import_slots = asyncio.Semaphore(4)
+# Opt-in: speculatively summarize each imported paper (spends Groq quota up front)
+PREFETCH_SUMMARIES = os.getenv("PREFETCH_SUMMARIES", "").lower() in ("1", "true", "yes")
+
+
+def _is_embeddable_text(text: str) -> bool:
+    """Return True if extracted PDF text looks like real prose worth embedding."""
+    return len(text) > _MIN_EMBED_CHARS and len(set(text)) > _MIN_EMBED_DISTINCT_CHARS
+
+
+async def _embed_paper_background(paper_id: int, content: str):
     """Background task: embed paper content into ChromaDB vector store."""
     try:
-        chunk_count = vector_store.add_paper(paper_id, content)
+        chunk_count = await vector_store.add_paper(paper_id, content[:_MAX_EMBED_CHARS])
         print(f"[BACKGROUND] Paper {paper_id}: embedded {chunk_count} chunks")
     except Exception as e:
         print(f"[WARNING] Background embedding failed for paper {paper_id}: {e}")
 
 
+async def _embed_and_prefetch_background(paper_fields: dict, content: str):
+    """Background task: embed a freshly imported paper, then speculatively summarize it.
+    The prefetch retrieves the same chunks the summarize tool will, so the user's
+    first "summarize" is usually a cache hit. `paper_fields` is a plain snapshot
+    (id, title, authors, abstract, content) — the request's session is gone by now."""
+    paper = SimpleNamespace(**paper_fields)
+    await _embed_paper_background(paper.id, content)
+    try:
+        chunks = await vector_store.query_papers([paper.id], SUMMARY_QUERY_HINT, n_results=20)
+        ResearchAssistant().prefetch_summaries([paper], chunks)
+    except Exception as e:
+        print(f"[WARNING] Summary prefetch failed for paper {paper.id}: {e}")
+
+
+async def _embed_papers_background(items: list[tuple[int, str]]):
+    """Background task: embed several papers' content in one batch."""
+    try:
+        await vector_store.add_papers([(pid, content[:_MAX_EMBED_CHARS]) for pid, content in items])
+    except Exception as e:
+        print(f"[WARNING] Background embedding failed for papers {[pid for pid, _ in items]}: {e}")
+
+
 async def _fetch_pdf_bytes(url: str) -> Optional[bytes]:
     """Try to download a PDF from a URL. Returns bytes or None."""
     if not url:
         return None
     try:
-        async with httpx.AsyncClient(timeout=30.0, follow_redirects=True) as client:
-            resp = await client.get(url)
-            resp.raise_for_status()
-            ct = resp.headers.get("content-type", "")
-            if "pdf" in ct or url.lower().endswith(".pdf") or resp.content[:5] == b"%PDF-":
-                return resp.content
-            return None
+        resp = await _http.get(url)
+        resp.raise_for_status()
+        ct = resp.headers.get("content-type", "")
+        if "pdf" in ct or url.lower().endswith(".pdf") or resp.content[:5] == b"%PDF-":
+            return resp.content
+        return None
     except Exception as e:
         print(f"[FETCH_PDF] Failed to download PDF from {url}: {e}")
         return None
 
 
+def _extract_pdf_text(pdf_bytes: Optional[bytes]) -> str:
+    """Extract plain text from fetched PDF bytes ("" if missing or unreadable)."""
+    if not pdf_bytes:
+        return ""
+    try:
+        reader = PyPDF2.PdfReader(io.BytesIO(pdf_bytes))
+        pages = [p.extract_text() or "" for p in reader.pages]
+        return "\n".join(pages).replace("\x00", "")
+    except Exception as e:
+        print(f"[IMPORT] PDF text extraction failed: {e}")
+        return ""
+
+
+async def _fetch_and_extract_pdf(url: str) -> tuple[Optional[bytes], str]:
+    """Download a PDF and extract its text, holding one of the shared import slots."""
+    async with _import_slots:
+        pdf_bytes = await _fetch_pdf_bytes(url)
+        content = await asyncio.to_thread(_extract_pdf_text, pdf_bytes)
+    return pdf_bytes, content
+
+
 def parse_arxiv_results(xml_text: str) -> list:
     """Parse arXiv Atom XML response into a list of paper dicts."""
     papers = []
@@ -155,24 +232,25 @@ def parse_arxiv_results(xml_text: str) -> list:
 @router.get("/search")
 async def search_papers(
     query: str,
-    current_user: User = Depends(get_current_user),
+    user_id: int = Depends(get_current_user_id),
 ):
     if not query or not query.strip():
         raise HTTPException(status_code=400, detail="Query parameter is required")
 
     try:
-        async with httpx.AsyncClient(timeout=15.0) as http_client:
-            resp = await http_client.get(
-                "https://export.arxiv.org/api/query",
-                params={
-                    "search_query": f"all:{query}",
-                    "start": 0,
-                    "max_results": 20,
-                    "sortBy": "relevance",
-                    "sortOrder": "descending",
-                },
-            )
-            resp.raise_for_status()
+        resp = await _http.get(
+            "https://export.arxiv.org/api/query",
+            params={
+                "search_query": f"all:{query}",
+                "start": 0,
+                "max_results": 20,
+                "sortBy": "relevance",
+                "sortOrder": "descending",
+            },
+            timeout=15.0,
+            follow_redirects=False,
+        )
+        resp.raise_for_status()
     except httpx.HTTPError as e:
         raise HTTPException(status_code=502, detail=f"Error querying arXiv: {str(e)}")
 
@@ -218,7 +296,7 @@ async def hybrid_search_papers(
     query: str,
     workspace_id: Optional[int] = None,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    user_id: int = Depends(get_current_user_id),
 ):
     """Search user's own papers using hybrid keyword + semantic ranking.
 
@@ -228,7 +306,7 @@ async def hybrid_search_papers(
         raise HTTPException(status_code=400, detail="Query parameter is required")
 
     # Fetch user's papers (optionally filtered by workspace)
-    stmt = select(Paper).where(Paper.user_id == current_user.id)
+    stmt = select(Paper).where(Paper.user_id == user_id)
     if workspace_id is not None:
         stmt = stmt.where(Paper.workspace_id == workspace_id)
     result = await db.execute(stmt)
@@ -248,7 +326,9 @@ async def hybrid_search_papers(
     # --- Semantic scoring (via ChromaDB) ---
     semantic_scores: dict[int, float] = {}
     try:
-        semantic_scores = vector_store.semantic_search_all(query, paper_ids, n_results=100)
+        semantic_scores = await asyncio.to_thread(
+            vector_store.semantic_search_all, query, paper_ids, n_results=100
+        )
     except Exception as e:
         print(f"[HYBRID SEARCH] Semantic scoring failed, using keyword only: {e}")
 
@@ -292,13 +372,13 @@ async def import_paper(
     body: PaperImport,
     background_tasks: BackgroundTasks,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    user_id: int = Depends(get_current_user_id),
 ):
     # Verify workspace belongs to user
     result = await db.execute(
         select(Workspace).where(
             Workspace.id == body.workspace_id,
-            Workspace.user_id == current_user.id,
+            Workspace.user_id == user_id,
         )
     )
     workspace = result.scalar_one_or_none()
@@ -309,14 +389,7 @@ async def import_paper(
     pdf_bytes = await _fetch_pdf_bytes(body.pdf_url)
 
     # Extract text from fetched PDF for search / embeddings
-    content = ""
-    if pdf_bytes:
-        try:
-            reader = PyPDF2.PdfReader(io.BytesIO(pdf_bytes))
-            pages = [p.extract_text() or "" for p in reader.pages]
-            content = "\n".join(pages).replace("\x00", "")
-        except Exception as e:
-            print(f"[IMPORT] PDF text extraction failed: {e}")
+    content = _extract_pdf_text(pdf_bytes)
 
     paper = Paper(
         title=body.title,
@@ -327,17 +400,26 @@ async def import_paper(
         published_date=body.published_date,
         content=content or body.abstract or "",
         pdf_data=pdf_bytes,
-        user_id=current_user.id,
+        user_id=user_id,
         workspace_id=body.workspace_id,
     )
     db.add(paper)
     await db.flush()
-    await db.refresh(paper)
 
-    # Embed paper content into ChromaDB for semantic search
+    # Embed paper content into ChromaDB for semantic search (and, if enabled, prefetch its summary)
     embed_text = content or body.abstract or ""
     if embed_text.strip():
-        background_tasks.add_task(_embed_paper_background, paper.id, embed_text)
+        if PREFETCH_SUMMARIES:
+            paper_fields = {
+                "id": paper.id,
+                "title": paper.title,
+                "authors": paper.authors,
+                "abstract": paper.abstract,
+                "content": paper.content,
+            }
+            background_tasks.add_task(_embed_and_prefetch_background, paper_fields, embed_text)
+        else:
+            background_tasks.add_task(_embed_paper_background, paper.id, embed_text)
 
     return {
         "message": "Paper imported successfully",
@@ -356,22 +438,104 @@ async def import_paper(
     }
 
 
+@router.post("/import-batch")
+async def import_papers_batch(
+    body: list[PaperImport],
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_db),
+    user_id: int = Depends(get_current_user_id),
+):
+    """Import many search results at once with a single multi-row INSERT."""
+    if not body:
+        return {"message": "No papers to import", "papers": []}
+    if len(body) > _MAX_BATCH_IMPORT:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Too many papers in one import (max {_MAX_BATCH_IMPORT})",
+        )
+
+    # Verify every target workspace belongs to user
+    workspace_ids = {p.workspace_id for p in body}
+    result = await db.execute(
+        select(Workspace.id).where(
+            Workspace.id.in_(workspace_ids),
+            Workspace.user_id == user_id,
+        )
+    )
+    if set(result.scalars().all()) != workspace_ids:
+        raise HTTPException(status_code=404, detail="Workspace not found")
+
+    # Fetch open-access PDFs and extract their text off the event loop, a few at a time
+    fetched = await asyncio.gather(*(_fetch_and_extract_pdf(p.pdf_url) for p in body))
+    pdfs = [pdf_bytes for pdf_bytes, _ in fetched]
+    contents = [content for _, content in fetched]
+
+    rows = [
+        {
+            "title": p.title,
+            "authors": p.authors,
+            "abstract": p.abstract,
+            "url": p.url,
+            "doi": p.doi,
+            "published_date": p.published_date,
+            "content": content or p.abstract or "",
+            "pdf_data": pdf_bytes,
+            "user_id": user_id,
+            "workspace_id": p.workspace_id,
+        }
+        for p, pdf_bytes, content in zip(body, pdfs, contents)
+    ]
+    inserted = await db.execute(
+        insert(Paper).returning(Paper.id, Paper.imported_at, sort_by_parameter_order=True),
+        rows,
+    )
+    inserted_rows = inserted.all()
+
+    papers_out = []
+    to_embed = []
+    for p, pdf_bytes, content, (paper_id, imported_at) in zip(body, pdfs, contents, inserted_rows):
+        embed_text = content or p.abstract or ""
+        if embed_text.strip():
+            to_embed.append((paper_id, embed_text))
+        papers_out.append({
+            "id": paper_id,
+            "title": p.title,
+            "authors": p.authors,
+            "abstract": p.abstract,
+            "url": p.url,
+            "doi": p.doi,
+            "published_date": p.published_date,
+            "workspace_id": p.workspace_id,
+            "imported_at": str(imported_at),
+            "has_pdf": pdf_bytes is not None,
+        })
+
+    # Embed all imported papers into ChromaDB for semantic search in one batch
+    if to_embed:
+        background_tasks.add_task(_embed_papers_background, to_embed)
+
+    return {
+        "message": f"Imported {len(papers_out)} papers successfully",
+        "papers": papers_out,
+    }
+
+
 @router.post("/upload")
 async def upload_paper(
     background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
     workspace_id: int = Form(...),
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    user_id: int = Depends(get_current_user_id),
 ):
     import traceback as _tb
-    print(f"[UPLOAD] START  user={current_user.id}  ws={workspace_id}  file={file.filename}")
+    print(f"[UPLOAD] START  user={user_id}  ws={workspace_id}  file={file.filename}")
     try:
         # Verify workspace belongs to user
         result = await db.execute(
             select(Workspace).where(
                 Workspace.id == workspace_id,
-                Workspace.user_id == current_user.id,
+                Workspace.user_id == user_id,
             )
         )
         workspace = result.scalar_one_or_none()
@@ -406,17 +570,18 @@ async def upload_paper(
             title=title,
             content=content,
             pdf_data=pdf_bytes,
-            user_id=current_user.id,
+            user_id=user_id,
             workspace_id=workspace_id,
         )
         db.add(paper)
         await db.flush()
-        await db.refresh(paper)
         print(f"[UPLOAD] Paper saved: id={paper.id}")
 
         # Embed PDF content into ChromaDB in the background (non-blocking)
-        if content.strip():
+        if _is_embeddable_text(content):
             background_tasks.add_task(_embed_paper_background, paper.id, content)
+        else:
+            print(f"[UPLOAD] Paper {paper.id}: skipping embedding ({len(content)} chars, likely scanned)")
 
         return {
             "message": "Paper uploaded successfully",
@@ -440,13 +605,13 @@ async def upload_paper(
 async def list_papers_in_workspace(
     workspace_id: int,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    user_id: int = Depends(get_current_user_id),
 ):
     # Verify workspace belongs to user
     result = await db.execute(
         select(Workspace).where(
             Workspace.id == workspace_id,
-            Workspace.user_id == current_user.id,
+            Workspace.user_id == user_id,
         )
     )
     workspace = result.scalar_one_or_none()
@@ -482,11 +647,11 @@ async def list_papers_in_workspace(
 async def get_paper_pdf(
     paper_id: int,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    user_id: int = Depends(get_current_user_id),
 ):
     """Serve the stored PDF for inline preview (Content-Disposition: inline)."""
     result = await db.execute(
-        select(Paper).where(Paper.id == paper_id, Paper.user_id == current_user.id)
+        select(Paper).where(Paper.id == paper_id, Paper.user_id == user_id)
     )
     paper = result.scalar_one_or_none()
     if not paper or not paper.pdf_data:
@@ -504,7 +669,7 @@ async def get_paper_pdf(
 async def get_paper_content_preview(
     paper_id: int,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    user_id: int = Depends(get_current_user_id),
 ):
     """Return a text-based content preview for a paper.
 
@@ -512,7 +677,7 @@ async def get_paper_content_preview(
     Used by the frontend fallback when the PDF cannot be rendered inline.
     """
     result = await db.execute(
-        select(Paper).where(Paper.id == paper_id, Paper.user_id == current_user.id)
+        select(Paper).where(Paper.id == paper_id, Paper.user_id == user_id)
     )
     paper = result.scalar_one_or_none()
     if not paper:
@@ -526,8 +691,8 @@ async def get_paper_content_preview(
     else:
         # 2. Try vector store chunks as last resort
         try:
-            chunks = vector_store.query_paper(
-                paper.id, paper.title or "summary overview", n_results=10
+            chunks = await asyncio.to_thread(
+                vector_store.query_paper, paper.id, paper.title or "summary overview", n_results=10
             )
             if chunks:
                 preview_text = "\n\n".join(chunks)
@@ -549,11 +714,11 @@ async def get_paper_content_preview(
 async def download_paper_pdf(
     paper_id: int,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    user_id: int = Depends(get_current_user_id),
 ):
     """Serve the stored PDF for download (Content-Disposition: attachment)."""
     result = await db.execute(
-        select(Paper).where(Paper.id == paper_id, Paper.user_id == current_user.id)
+        select(Paper).where(Paper.id == paper_id, Paper.user_id == user_id)
     )
     paper = result.scalar_one_or_none()
     if not paper or not paper.pdf_data:
@@ -576,7 +741,7 @@ class ProxyPdfRequest(BaseModel):
 @router.post("/proxy-pdf")
 async def proxy_pdf(
     body: ProxyPdfRequest,
-    current_user: User = Depends(get_current_user),
+    user_id: int = Depends(get_current_user_id),
 ):
     """Proxy-fetch a PDF from an external URL.
 
@@ -596,43 +761,42 @@ async def proxy_pdf(
     if body.url:
         candidate_urls.append(body.url)
 
-    async with httpx.AsyncClient(timeout=30.0, follow_redirects=True) as client:
-        for target in candidate_urls:
-            try:
-                # Special handling for Unpaywall (JSON API → gives us the real PDF link)
-                if "unpaywall.org" in target:
-                    resp = await client.get(target)
-                    if resp.status_code == 200:
-                        data = resp.json()
-                        oa = data.get("best_oa_location") or {}
-                        real_pdf = oa.get("url_for_pdf") or oa.get("url")
-                        if real_pdf:
-                            pdf_resp = await client.get(real_pdf)
-                            if pdf_resp.status_code == 200 and (
-                                b"%PDF" in pdf_resp.content[:10]
-                                or "pdf" in pdf_resp.headers.get("content-type", "")
-                            ):
-                                return Response(
-                                    content=pdf_resp.content,
-                                    media_type="application/pdf",
-                                    headers={"Content-Disposition": 'inline; filename="paper.pdf"'},
-                                )
-                    continue
-
-                resp = await client.get(target)
-                if resp.status_code == 200 and (
-                    b"%PDF" in resp.content[:10]
-                    or "pdf" in resp.headers.get("content-type", "")
-                ):
-                    return Response(
-                        content=resp.content,
-                        media_type="application/pdf",
-                        headers={"Content-Disposition": 'inline; filename="paper.pdf"'},
-                    )
-            except Exception as e:
-                print(f"[PROXY-PDF] Failed for {target}: {e}")
+    for target in candidate_urls:
+        try:
+            # Special handling for Unpaywall (JSON API → gives us the real PDF link)
+            if "unpaywall.org" in target:
+                resp = await _http.get(target)
+                if resp.status_code == 200:
+                    data = resp.json()
+                    oa = data.get("best_oa_location") or {}
+                    real_pdf = oa.get("url_for_pdf") or oa.get("url")
+                    if real_pdf:
+                        pdf_resp = await _http.get(real_pdf)
+                        if pdf_resp.status_code == 200 and (
+                            b"%PDF" in pdf_resp.content[:10]
+                            or "pdf" in pdf_resp.headers.get("content-type", "")
+                        ):
+                            return Response(
+                                content=pdf_resp.content,
+                                media_type="application/pdf",
+                                headers={"Content-Disposition": 'inline; filename="paper.pdf"'},
+                            )
                 continue
 
+            resp = await _http.get(target)
+            if resp.status_code == 200 and (
+                b"%PDF" in resp.content[:10]
+                or "pdf" in resp.headers.get("content-type", "")
+            ):
+                return Response(
+                    content=resp.content,
+                    media_type="application/pdf",
+                    headers={"Content-Disposition": 'inline; filename="paper.pdf"'},
+                )
+        except Exception as e:
+            print(f"[PROXY-PDF] Failed for {target}: {e}")
+            continue
+
     raise HTTPException(status_code=404, detail="Could not fetch PDF from any available URL")
 
 
@@ -640,12 +804,12 @@ async def proxy_pdf(
 async def delete_paper(
     paper_id: int,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    user_id: int = Depends(get_current_user_id),
 ):
     result = await db.execute(
         select(Paper).where(
             Paper.id == paper_id,
-            Paper.user_id == current_user.id,
+            Paper.user_id == user_id,
         )
     )
     paper = result.scalar_one_or_none()
@@ -654,7 +818,7 @@ async def delete_paper(
 
     # Clean up vector embeddings if paper had content
     try:
-        vector_store.delete_paper(paper.id)
+        await vector_store.delete_paper(paper.id)
     except Exception as e:
         print(f"[WARNING] Failed to delete embeddings for paper {paper.id}: {e}")
 
@@ -18,13 +18,12 @@ from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from utils.database import get_db
-from utils.auth_utils import get_current_user
+from utils.auth_utils import AuthenticatedUser, get_current_user
 from utils import vector_store
-from models.user import User
 from models.workspace import Workspace
 from models.paper import Paper
 from agents.summary_agent import generate_structured_summary
-from agents.diagram_agent import generate_diagrams, regenerate_single_diagram, render_diagram_to_png, DIAGRAMS_DIR
+from agents.diagram_agent import generate_diagrams, regenerate_single_diagram, render_diagrams_to_png, DIAGRAMS_DIR
 from agents.pdf_generator import generate_pdf, PDF_DIR
 
 router = APIRouter()
@@ -80,7 +79,7 @@ def _build_paper_text(papers, retrieved_chunks: dict | None = None) -> str:
 async def generate_visual_summary(
     body: GenerateRequest,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: AuthenticatedUser = Depends(get_current_user),
 ):
     """Full pipeline: papers → summary → diagrams → PDF."""
 
@@ -108,7 +107,7 @@ async def generate_visual_summary(
     retrieved_chunks = {}
     if paper_ids:
         try:
-            retrieved_chunks = vector_store.query_papers(
+            retrieved_chunks = await vector_store.query_papers_parallel(
                 paper_ids,
                 "summarize key findings, methodology, architecture, and contributions",
                 n_results=5,
@@ -137,12 +136,15 @@ async def generate_visual_summary(
         print(f"[VISUAL SUMMARY] Diagram generation failed: {e}")
         diagrams = []
 
-    # ── Render diagrams to PNG for PDF ──
-    diagram_images: list[str | None] = []
-    for i, d in enumerate(diagrams):
-        img_path = os.path.join(DIAGRAMS_DIR, session_id, f"diagram_{i + 1}.png")
-        success = render_diagram_to_png(d["mermaid_code"], img_path)
-        diagram_images.append(img_path if success else None)
+    # ── Render diagrams to PNG for PDF (all diagrams in parallel) ──
+    img_paths = [
+        os.path.join(DIAGRAMS_DIR, session_id, f"diagram_{i + 1}.png")
+        for i in range(len(diagrams))
+    ]
+    rendered = await render_diagrams_to_png([d["mermaid_code"] for d in diagrams], img_paths)
+    diagram_images: list[str | None] = [
+        path if success else None for path, success in zip(img_paths, rendered)
+    ]
 
     # ── Agent 3: PDF Generation ──
     pdf_ready = False
@@ -185,7 +187,7 @@ class RegenerateDiagramRequest(BaseModel):
 @router.post("/regenerate-diagram", response_model=DiagramOut)
 async def regenerate_diagram(
     body: RegenerateDiagramRequest,
-    current_user: User = Depends(get_current_user),
+    current_user: AuthenticatedUser = Depends(get_current_user),
 ):
     """Regenerate a single diagram by calling the LLM again."""
     try:
@@ -208,7 +210,7 @@ async def regenerate_diagram(
 @router.get("/download/{session_id}")
 async def download_pdf(
     session_id: str,
-    current_user: User = Depends(get_current_user),
+    current_user: AuthenticatedUser = Depends(get_current_user),
 ):
     """Download the generated academic visual summary PDF."""
     path = os.path.join(PDF_DIR, f"storyboard_{session_id}.pdf")
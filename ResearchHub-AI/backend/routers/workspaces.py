@@ -4,9 +4,8 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
 from typing import Optional
 from utils.database import get_db
-from utils.auth_utils import get_current_user
+from utils.auth_utils import get_current_user_id
 from utils import vector_store
-from models.user import User
 from models.workspace import Workspace
 from models.paper import Paper
 from models.conversation import Conversation
@@ -32,16 +31,15 @@ class WorkspaceUpdate(BaseModel):
 async def create_workspace(
     body: WorkspaceCreate,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    user_id: int = Depends(get_current_user_id),
 ):
     workspace = Workspace(
         name=body.name,
         description=body.description,
-        user_id=current_user.id,
+        user_id=user_id,
     )
     db.add(workspace)
     await db.flush()
-    await db.refresh(workspace)
     return {
         "id": workspace.id,
         "name": workspace.name,
@@ -54,11 +52,11 @@ async def create_workspace(
 @router.get("")
 async def list_workspaces(
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    user_id: int = Depends(get_current_user_id),
 ):
     # Workspaces with paper counts
     result = await db.execute(
-        select(Workspace).where(Workspace.user_id == current_user.id)
+        select(Workspace).where(Workspace.user_id == user_id)
     )
     workspaces = result.scalars().all()
 
@@ -84,12 +82,12 @@ async def list_workspaces(
 async def get_workspace(
     workspace_id: int,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    user_id: int = Depends(get_current_user_id),
 ):
     result = await db.execute(
         select(Workspace).where(
             Workspace.id == workspace_id,
-            Workspace.user_id == current_user.id,
+            Workspace.user_id == user_id,
         )
     )
     workspace = result.scalar_one_or_none()
@@ -116,12 +114,12 @@ async def update_workspace(
     workspace_id: int,
     body: WorkspaceUpdate,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    user_id: int = Depends(get_current_user_id),
 ):
     result = await db.execute(
         select(Workspace).where(
             Workspace.id == workspace_id,
-            Workspace.user_id == current_user.id,
+            Workspace.user_id == user_id,
         )
     )
     workspace = result.scalar_one_or_none()
@@ -134,7 +132,6 @@ async def update_workspace(
         workspace.description = body.description
 
     await db.flush()
-    await db.refresh(workspace)
     return {
         "id": workspace.id,
         "name": workspace.name,
@@ -148,12 +145,12 @@ async def update_workspace(
 async def delete_workspace(
     workspace_id: int,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    user_id: int = Depends(get_current_user_id),
 ):
     result = await db.execute(
         select(Workspace).where(
             Workspace.id == workspace_id,
-            Workspace.user_id == current_user.id,
+            Workspace.user_id == user_id,
         )
     )
     workspace = result.scalar_one_or_none()
@@ -167,7 +164,7 @@ async def delete_workspace(
     papers = papers_result.scalars().all()
     for paper in papers:
         try:
-            vector_store.delete_paper(paper.id)
+            await vector_store.delete_paper(paper.id)
         except Exception as e:
             print(f"[WARNING] Failed to delete embeddings for paper {paper.id}: {e}")
 
@@ -0,0 +1,26 @@
+import pytest
+
+pytest.importorskip("edge_tts")
+pytest.importorskip("groq")
+
+from utils.audio_generator import _strip_residual_formatting
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        # Stacked line-start markers are all removed, not just the first
+        ("##  -    ", ""),
+        ("*  *  ", ""),
+        ("*  *  model", "model"),
+        ("- 3. item", "item"),
+        ("#Heading\n  * sub\n2) two", "Heading sub two"),
+        # Inline markup keeps its text
+        ("- **Bold** item", "Bold item"),
+        ("See [the paper](http://example.com) and `code`", "See the paper and code"),
+        ("Para _it_ here 🎉", "Para it here"),
+        ("One\n\n\nTwo\nlines", "One\n\nTwo lines"),
+    ],
+)
+def test_strip_residual_formatting(text, expected):
+    assert _strip_residual_formatting(text) == expected
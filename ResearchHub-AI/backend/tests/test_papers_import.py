@@ -0,0 +1,109 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+
+for _module in ("fastapi", "httpx", "PyPDF2", "sqlalchemy", "asyncpg", "jose", "bcrypt", "groq", "chromadb", "numpy", "dotenv"):
+    pytest.importorskip(_module)
+
+from fastapi import BackgroundTasks, HTTPException
+
+from routers import papers
+from routers.papers import PaperImport, import_papers_batch
+
+
+def _paper(i: int, workspace_id: int = 1, pdf_url: str | None = None) -> PaperImport:
+    return PaperImport(
+        title=f"Paper {i}",
+        authors="A. Author",
+        abstract=f"Abstract {i}",
+        url=f"https://example.org/abs/{i}",
+        pdf_url=pdf_url,
+        workspace_id=workspace_id,
+    )
+
+
+class _Result:
+    def __init__(self, rows):
+        self._rows = rows
+
+    def scalars(self):
+        return self
+
+    def all(self):
+        return self._rows
+
+
+class _FakeSession:
+    """Answers the workspace ownership SELECT, then the multi-row INSERT ... RETURNING."""
+
+    def __init__(self, workspace_ids):
+        self.workspace_ids = list(workspace_ids)
+        self.inserted = None
+
+    async def execute(self, statement, params=None):
+        if params is None:
+            return _Result(self.workspace_ids)
+        self.inserted = params
+        return _Result([(100 + i, datetime(2024, 1, 1)) for i in range(len(params))])
+
+
+def test_batch_over_cap_is_rejected_before_any_work():
+    body = [_paper(i) for i in range(papers._MAX_BATCH_IMPORT + 1)]
+    with pytest.raises(HTTPException) as exc:
+        # db is never touched: the size check comes first
+        asyncio.run(import_papers_batch(body, BackgroundTasks(), db=None, user_id=1))
+    assert exc.value.status_code == 413
+
+
+def test_empty_batch_is_a_no_op():
+    result = asyncio.run(import_papers_batch([], BackgroundTasks(), db=None, user_id=1))
+    assert result["papers"] == []
+
+
+def test_unowned_workspace_is_rejected():
+    body = [_paper(1, workspace_id=1), _paper(2, workspace_id=2)]
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(import_papers_batch(body, BackgroundTasks(), db=_FakeSession([1]), user_id=1))
+    assert exc.value.status_code == 404
+
+
+def test_pdf_fetches_are_bounded_by_import_slots(monkeypatch):
+    limit = papers._import_slots._value
+    state = {"active": 0, "peak": 0}
+
+    async def fake_fetch(url):
+        state["active"] += 1
+        state["peak"] = max(state["peak"], state["active"])
+        await asyncio.sleep(0.01)
+        state["active"] -= 1
+        return None
+
+    async def scenario():
+        # Fresh semaphore bound to this test's event loop, same size as the module's
+        monkeypatch.setattr(papers, "_import_slots", asyncio.Semaphore(limit))
+        monkeypatch.setattr(papers, "_fetch_pdf_bytes", fake_fetch)
+        return await asyncio.gather(*(papers._fetch_and_extract_pdf(f"u{i}") for i in range(limit * 3)))
+
+    results = asyncio.run(scenario())
+    assert results == [(None, "")] * (limit * 3)
+    assert state["peak"] == limit
+
+
+def test_batch_inserts_once_and_schedules_one_embedding_task(monkeypatch):
+    async def no_pdf(url):
+        return None, ""
+
+    monkeypatch.setattr(papers, "_fetch_and_extract_pdf", no_pdf)
+    body = [_paper(i) for i in range(3)]
+    db = _FakeSession([1])
+    tasks = BackgroundTasks()
+
+    result = asyncio.run(import_papers_batch(body, tasks, db=db, user_id=7))
+
+    assert [p["id"] for p in result["papers"]] == [100, 101, 102]
+    assert [row["content"] for row in db.inserted] == ["Abstract 0", "Abstract 1", "Abstract 2"]
+    assert all(row["user_id"] == 7 for row in db.inserted)
+    assert len(tasks.tasks) == 1
+    assert tasks.tasks[0].func is papers._embed_papers_background
+    assert tasks.tasks[0].args[0] == [(100, "Abstract 0"), (101, "Abstract 1"), (102, "Abstract 2")]
@@ -0,0 +1,133 @@
+import asyncio
+import time
+
+import pytest
+
+from utils.rate_limiter import AIMDRateLimiter, parse_duration, retry_after_from_headers
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [
+        ("7.66s", 7.66),
+        ("2m59.56s", 179.56),
+        ("120ms", 0.12),
+        ("1h", 3600.0),
+        ("12", 12.0),
+        ("-3", 0.0),
+    ],
+)
+def test_parse_duration(value, expected):
+    assert parse_duration(value) == pytest.approx(expected)
+
+
+@pytest.mark.parametrize("value", ["", None, "soon"])
+def test_parse_duration_unparseable(value):
+    assert parse_duration(value) is None
+
+
+def test_retry_after_header_wins():
+    headers = {"retry-after": "3", "x-ratelimit-remaining-requests": "0", "x-ratelimit-reset-requests": "20s"}
+    assert retry_after_from_headers(headers) == 3.0
+
+
+def test_exhausted_quota_headers_use_longest_reset():
+    headers = {
+        "x-ratelimit-remaining-requests": "0",
+        "x-ratelimit-reset-requests": "2s",
+        "x-ratelimit-remaining-tokens": "0",
+        "x-ratelimit-reset-tokens": "1m",
+    }
+    assert retry_after_from_headers(headers) == 60.0
+
+
+def test_remaining_quota_means_no_wait():
+    headers = {"x-ratelimit-remaining-requests": "5", "x-ratelimit-reset-requests": "2s"}
+    assert retry_after_from_headers(headers) is None
+    assert retry_after_from_headers(None) is None
+
+
+def test_initial_concurrency_is_clamped():
+    assert AIMDRateLimiter(rpm=30).concurrency == 4.0
+    assert AIMDRateLimiter(rpm=30, max_concurrency=2.0).concurrency == 2.0
+    assert AIMDRateLimiter(rpm=30, min_concurrency=6.0).concurrency == 6.0
+
+
+def test_additive_increase_capped_at_max():
+    limiter = AIMDRateLimiter(rpm=30, initial_concurrency=7.0, max_concurrency=8.0, increase=0.5)
+    limiter.record_success(0.2)
+    assert limiter.concurrency == 7.5
+    limiter.record_success(0.2)
+    limiter.record_success(0.2)
+    assert limiter.concurrency == 8.0
+
+
+def test_multiplicative_decrease_floored_at_min():
+    limiter = AIMDRateLimiter(rpm=30, initial_concurrency=4.0, decrease=0.5)
+    limiter.record_throttle({"retry-after": "0"})
+    assert limiter.concurrency == 2.0
+    for _ in range(5):
+        limiter.record_throttle({"retry-after": "0"})
+    assert limiter.concurrency == limiter.min_concurrency == 1.0
+
+
+def test_throttle_pushes_back_next_start():
+    limiter = AIMDRateLimiter(rpm=30)
+    before = time.monotonic()
+    limiter.record_throttle({"retry-after": "10"})
+    # retry-after plus at most 10% + 0.25s of jitter
+    assert before + 10 <= limiter._not_before <= time.monotonic() + 11.25
+
+
+def test_concurrency_slots_block_until_release():
+    async def scenario():
+        limiter = AIMDRateLimiter(rpm=100, initial_concurrency=1.0)
+        await limiter.acquire()
+        second = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0.05)
+        assert not second.done()
+        await limiter.release()
+        await asyncio.wait_for(second, timeout=1)
+        await limiter.release()
+        assert limiter._in_flight == 0
+
+    asyncio.run(scenario())
+
+
+class _FakeSharedWindow:
+    """Returns the queued waits in order, then 0.0 (slot granted)."""
+
+    def __init__(self, waits):
+        self.waits = list(waits)
+        self.calls = []
+
+    async def areserve_request(self, name, rpm):
+        self.calls.append((name, rpm))
+        return self.waits.pop(0) if self.waits else 0.0
+
+
+def test_shared_window_reservation_is_checked_with_name_and_rpm():
+    async def scenario():
+        window = _FakeSharedWindow([])
+        limiter = AIMDRateLimiter(rpm=30, shared_window=window, name="groq:0")
+        await limiter.acquire()
+        assert window.calls == [("groq:0", 30)]
+        assert limiter._in_flight == 1
+        await limiter.release()
+
+    asyncio.run(scenario())
+
+
+def test_full_shared_window_returns_slot_and_retries():
+    async def scenario():
+        window = _FakeSharedWindow([0.05])
+        limiter = AIMDRateLimiter(rpm=30, shared_window=window)
+        start = time.monotonic()
+        await limiter.acquire()
+        assert time.monotonic() - start >= 0.05
+        assert len(window.calls) == 2
+        # The refused attempt is not left behind in the local window
+        assert limiter._in_flight == 1 and len(limiter._window) == 1
+        await limiter.release()
+
+    asyncio.run(scenario())
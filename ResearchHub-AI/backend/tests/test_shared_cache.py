@@ -0,0 +1,82 @@
+import asyncio
+import os
+import sqlite3
+import time
+
+import pytest
+
+pytest.importorskip("dotenv")
+
+from utils import shared_cache as shared_cache_module
+from utils.shared_cache import SharedCache
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "llm_cache.sqlite3")
+
+
+def _row_count(path):
+    with sqlite3.connect(path) as conn:
+        return conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+
+def test_file_is_created_lazily(db_path):
+    cache = SharedCache(db_path)
+    assert not os.path.exists(db_path)
+    assert cache.get("missing") is None
+    assert os.path.exists(db_path)
+
+
+def test_default_path_is_anchored_to_backend_dir():
+    if "LLM_SHARED_CACHE_PATH" in os.environ:
+        pytest.skip("path overridden by LLM_SHARED_CACHE_PATH")
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(shared_cache_module.__file__)))
+    assert os.path.abspath(shared_cache_module.SHARED_CACHE_PATH) == os.path.join(backend_dir, "llm_cache.sqlite3")
+
+
+def test_values_are_shared_through_sqlite(db_path):
+    asyncio.run(SharedCache(db_path).aset("k", "v"))
+    # A second instance (another worker) has an empty memory tier and reads from disk
+    assert asyncio.run(SharedCache(db_path).aget("k")) == "v"
+
+
+def test_entries_expire_after_ttl(db_path):
+    SharedCache(db_path, ttl=0.05).set("k", "v")
+    time.sleep(0.1)
+    assert SharedCache(db_path, ttl=0.05).get("k") is None
+
+
+def test_oversized_values_are_not_stored(db_path):
+    cache = SharedCache(db_path, max_value_chars=10)
+    cache.set("k", "x" * 11)
+    assert cache.get("k") is None
+
+
+def test_purge_drops_expired_and_excess_rows(db_path, monkeypatch):
+    monkeypatch.setattr(shared_cache_module, "_PURGE_EVERY", 5)
+    cache = SharedCache(db_path, ttl=0.05, max_rows=3)
+    cache.set("old", "v")
+    time.sleep(0.1)
+    cache.ttl = 600
+    for i in range(4):
+        cache.set(f"k{i}", "v")  # the 5th write triggers the purge
+    assert _row_count(db_path) == 3
+    assert cache._read("old") is None
+    assert cache._read("k0") is None  # oldest surviving entry trimmed by max_rows
+    assert cache._read("k3") == "v"
+
+
+def test_reserve_request_enforces_rpm_per_name(db_path):
+    cache = SharedCache(db_path)
+    assert cache.reserve_request("groq:0", 2) == 0.0
+    assert cache.reserve_request("groq:0", 2) == 0.0
+    wait = cache.reserve_request("groq:0", 2)
+    assert 59.0 < wait <= 60.0
+    # Other keys have their own window
+    assert asyncio.run(cache.areserve_request("groq:1", 2)) == 0.0
+
+
+def test_reserve_request_is_shared_across_instances(db_path):
+    assert SharedCache(db_path).reserve_request("groq:0", 1) == 0.0
+    assert SharedCache(db_path).reserve_request("groq:0", 1) > 0.0
@@ -0,0 +1,70 @@
+import random
+
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("chromadb")
+pytest.importorskip("dotenv")
+
+from utils.vector_store import CHUNK_OVERLAP, CHUNK_SIZE, _chunk_records, _chunk_text
+
+
+def _reference_chunk_text(text: str) -> list[str]:
+    """The original rfind-based chunker that _chunk_text must stay equivalent to."""
+    if not text or not text.strip():
+        return []
+    chunks = []
+    start = 0
+    while start < len(text):
+        end = start + CHUNK_SIZE
+        if end < len(text):
+            search_start = max(end - 100, start)
+            last_period = text.rfind(". ", search_start, end)
+            last_newline = text.rfind("\n", search_start, end)
+            break_point = max(last_period, last_newline)
+            if break_point > start:
+                end = break_point + 1
+        chunk = text[start:end].strip()
+        if chunk:
+            chunks.append(chunk)
+        start = end - CHUNK_OVERLAP if end < len(text) else len(text)
+    return chunks
+
+
+@pytest.mark.parametrize("text", ["", "   \n\t "])
+def test_blank_text_has_no_chunks(text):
+    assert _chunk_text(text) == []
+
+
+def test_short_text_is_one_chunk():
+    assert _chunk_text("  A short abstract.  ") == ["A short abstract."]
+
+
+def test_breaks_at_sentence_end_near_window_edge():
+    first = "x" * (CHUNK_SIZE - 40) + ". "
+    text = first + "y" * CHUNK_SIZE
+    chunks = _chunk_text(text)
+    assert chunks[0] == first.strip()
+    assert all(len(c) <= CHUNK_SIZE for c in chunks)
+
+
+def test_chunks_overlap():
+    text = "word " * 400
+    chunks = _chunk_text(text)
+    assert len(chunks) > 1
+    assert chunks[0][-CHUNK_OVERLAP // 2:] in chunks[1]
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_matches_reference_chunker(seed):
+    rng = random.Random(seed)
+    pieces = ["word", "Sentence.", ". ", "\n", "\n\n", " ", "x" * 120]
+    text = "".join(rng.choice(pieces) for _ in range(rng.randint(50, 800)))
+    assert _chunk_text(text) == _reference_chunk_text(text)
+
+
+def test_chunk_records_ids_are_fixed_width_and_ordered():
+    ids, metadatas = _chunk_records(42, 3)
+    assert ids == ["0000002a00000000", "0000002a00000001", "0000002a00000002"]
+    assert [m["chunk_index"] for m in metadatas] == [0, 1, 2]
+    assert all(m["paper_id"] == 42 for m in metadatas)
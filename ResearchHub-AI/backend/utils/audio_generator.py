@@ -7,11 +7,15 @@ script, then generates MP3 audio via edge-tts (Microsoft Edge TTS).
 Usage:
     from utils.audio_generator import generate_audio
     filepath = await generate_audio(summary_text, workspace_id)
+    url, chunks = await stream_audio(summary_text, workspace_id)
 """
 
 import os
 import re
 import uuid
+import hashlib
+from typing import AsyncIterator
+
 import edge_tts
 
 from utils.groq_client import get_gemini_response
@@ -19,6 +23,14 @@ from utils.groq_client import get_gemini_response
 MEDIA_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "media")
 os.makedirs(MEDIA_DIR, exist_ok=True)
 
+# Narration scripts cached on disk by summary hash — skips the LLM on regenerate.
+# Kept outside MEDIA_DIR, which is served publicly under /media.
+SCRIPT_CACHE_DIR = os.getenv(
+    "NARRATION_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), "cache", "narration_scripts"),
+)
+os.makedirs(SCRIPT_CACHE_DIR, exist_ok=True)
+
 # Microsoft Edge TTS voice — clear, natural-sounding English
 VOICE = "en-US-AriaNeural"
 
@@ -52,49 +64,123 @@ _NARRATION_USER = (
 )
 
 
+# ── Formatting cleanup: one alternation handles all markup in a single scan ──
+# Line-anchored markers come first so "* item" is treated as a bullet, not bold.
+# They repeat, so stacked markers ("## - item", "* * item") go in one match the
+# way the old one-pattern-per-pass stripper removed them.
+_RE_MARKUP = re.compile(
+    r"(?P<marker>^(?:\s*(?:#{1,6}\s*|[-*•]\s+|\d+[.)]\s+))+)"
+    r"|\*{1,3}(?P<bold>[^*]+)\*{1,3}"
+    r"|_{1,3}(?P<underscore>[^_]+)_{1,3}"
+    r"|\[(?P<link>[^\]]+)\]\([^)]+\)"
+    r"|`(?P<code>[^`]+)`"
+    # Emoji class: pictographs, ZWJ, variation selectors, misc symbols + dingbats
+    # (U+2600-U+27BF merged into one range so each codepoint hits fewer range checks)
+    r"|(?P<emoji>[\U0001F300-\U0001F9FF\U00002600-\U000027BF\U0000FE00-\U0000FE0F\U0000200D]+)",
+    re.MULTILINE,
+)
+_RE_MULTI_NEWLINE = re.compile(r"\n{2,}")
+_RE_SINGLE_NEWLINE = re.compile(r"(?<!\n)\n(?!\n)")
+_RE_MULTI_SPACE = re.compile(r"  +")
+
+
+def _replace_markup(m: re.Match) -> str:
+    kind = m.lastgroup
+    if kind in ("bold", "underscore", "link"):
+        # Inner text may itself contain markup (e.g. **[link](url)**)
+        return _RE_MARKUP.sub(_replace_markup, m.group(kind))
+    if kind == "code":
+        return m.group(kind)
+    return ""  # heading / list marker, emoji
+
+
 def _strip_residual_formatting(text: str) -> str:
     """Remove any residual markdown or formatting the LLM might sneak in."""
-    # Remove headings
-    text = re.sub(r"^#{1,6}\s*", "", text, flags=re.MULTILINE)
-    # Remove bold/italic
-    text = re.sub(r"\*{1,3}([^*]+)\*{1,3}", r"\1", text)
-    text = re.sub(r"_{1,3}([^_]+)_{1,3}", r"\1", text)
-    # Remove links
-    text = re.sub(r"\[([^\]]+)\]\([^)]+\)", r"\1", text)
-    # Remove backticks
-    text = re.sub(r"`([^`]+)`", r"\1", text)
-    # Remove bullet/list markers
-    text = re.sub(r"^\s*[-*•]\s+", "", text, flags=re.MULTILINE)
-    text = re.sub(r"^\s*\d+[.)]\s+", "", text, flags=re.MULTILINE)
-    # Remove emojis
-    text = re.sub(
-        r"[\U0001F300-\U0001F9FF\U00002702-\U000027B0\U0000FE00-\U0000FE0F"
-        r"\U0000200D\U00002600-\U000026FF\U00002700-\U000027BF]+",
-        "", text
-    )
+    text = _RE_MARKUP.sub(_replace_markup, text)
     # Collapse whitespace
-    text = re.sub(r"\n{2,}", "\n\n", text)
-    text = re.sub(r"(?<!\n)\n(?!\n)", " ", text)
-    text = re.sub(r"  +", " ", text)
+    text = _RE_MULTI_NEWLINE.sub("\n\n", text)
+    text = _RE_SINGLE_NEWLINE.sub(" ", text)
+    text = _RE_MULTI_SPACE.sub(" ", text)
     return text.strip()
 
 
-def _generate_narration_script(summary: str) -> str:
+def _script_cache_path(summary: str) -> str:
+    """Path of the cached narration script for this summary."""
+    digest = hashlib.blake2b(summary.encode("utf-8"), digest_size=16).hexdigest()
+    return os.path.join(SCRIPT_CACHE_DIR, f"{digest}.txt")
+
+
+async def _generate_narration_script(summary: str) -> str:
     """Use LLM to produce a polished ~225-word narration from raw summary."""
+    cache_path = _script_cache_path(summary)
+    try:
+        with open(cache_path, encoding="utf-8") as f:
+            print("[AUDIO] Narration script cache hit")
+            return f.read()
+    except OSError:
+        pass  # not cached yet
+
     user_prompt = _NARRATION_USER.format(summary=summary[:4000])
 
     try:
-        script = get_gemini_response(_NARRATION_SYSTEM, user_prompt)
+        script = await get_gemini_response(_NARRATION_SYSTEM, user_prompt)
         script = _strip_residual_formatting(script)
 
         # Validate length — if too short, the LLM failed; fall back
         if len(script.split()) < 80:
             raise ValueError("Narration too short")
-        return script
     except Exception as e:
         print(f"[AUDIO] LLM narration failed ({e}), falling back to cleaned summary")
         return _strip_residual_formatting(summary)
 
+    # Only successful LLM scripts are cached; fallbacks retry the LLM next time
+    try:
+        with open(cache_path, "w", encoding="utf-8") as f:
+            f.write(script)
+    except OSError as e:
+        print(f"[AUDIO] Could not cache narration script: {e}")
+    return script
+
+
+async def _prepare_narration(summary: str, workspace_id: int | str) -> tuple[str, str]:
+    """Validate the summary, build the narration script and pick an output filename.
+
+    Returns:
+        (narration, filename)
+    """
+    if not summary or len(summary.strip()) < 30:
+        raise ValueError("Summary is too short to generate meaningful audio.")
+
+    narration = await _generate_narration_script(summary)
+
+    print(f"[AUDIO] Narration: {len(narration.split())} words for workspace {workspace_id}")
+
+    unique_id = uuid.uuid4().hex[:8]
+    filename = f"audio_ws{workspace_id}_{unique_id}.mp3"
+    return narration, filename
+
+
+async def _tts_chunks(narration: str, filepath: str) -> AsyncIterator[bytes]:
+    """Yield MP3 chunks from edge-tts as they arrive, mirroring each one to filepath.
+    If synthesis fails or the consumer stops early, the partial file is removed."""
+    communicate = edge_tts.Communicate(narration, VOICE)
+    try:
+        with open(filepath, "wb") as f:
+            async for chunk in communicate.stream():
+                if chunk["type"] == "audio":
+                    f.write(chunk["data"])
+                    yield chunk["data"]
+    except BaseException:
+        _remove_quietly(filepath)
+        raise
+
+
+def _remove_quietly(filepath: str):
+    try:
+        os.remove(filepath)
+    except OSError:
+        pass
+
 
 async def generate_audio(summary: str, workspace_id: int | str) -> str:
     """Generate an MP3 narration from a summary.
@@ -110,20 +196,36 @@ async def generate_audio(summary: str, workspace_id: int | str) -> str:
     Returns:
         Relative URL path to the generated MP3 (e.g. "/media/audio_ws3_abc123.mp3").
     """
-    if not summary or len(summary.strip()) < 30:
-        raise ValueError("Summary is too short to generate meaningful audio.")
-
-    narration = _generate_narration_script(summary)
-
-    print(f"[AUDIO] Narration: {len(narration.split())} words for workspace {workspace_id}")
-
-    unique_id = uuid.uuid4().hex[:8]
-    filename = f"audio_ws{workspace_id}_{unique_id}.mp3"
-    filepath = os.path.join(MEDIA_DIR, filename)
+    narration, filename = await _prepare_narration(summary, workspace_id)
 
     # Generate TTS
-    communicate = edge_tts.Communicate(narration, VOICE)
-    await communicate.save(filepath)
+    async for _ in _tts_chunks(narration, os.path.join(MEDIA_DIR, filename)):
+        pass
 
     return f"/media/{filename}"
 
+
+async def stream_audio(summary: str, workspace_id: int | str) -> tuple[str, AsyncIterator[bytes]]:
+    """Like generate_audio, but hands back the MP3 bytes as edge-tts produces them
+    so the client can start playback before synthesis finishes. The file is still
+    written to MEDIA_DIR as the stream is consumed.
+    The first chunk is synthesised before returning, so edge-tts failures surface
+    here (before any response is sent) rather than mid-stream.
+
+    Returns:
+        (relative URL of the MP3 being written, async iterator of audio chunks)
+    """
+    narration, filename = await _prepare_narration(summary, workspace_id)
+    filepath = os.path.join(MEDIA_DIR, filename)
+    chunks = _tts_chunks(narration, filepath)
+    first = await anext(chunks, None)
+    if first is None:
+        _remove_quietly(filepath)
+        raise RuntimeError("edge-tts returned no audio")
+
+    async def relay():
+        yield first
+        async for chunk in chunks:
+            yield chunk
+
+    return f"/media/{filename}", relay()
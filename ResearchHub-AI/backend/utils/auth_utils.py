@@ -1,11 +1,14 @@
-from datetime import datetime, timedelta, timezone
+import asyncio
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from uuid import uuid4
 from jose import JWTError, jwt
 import bcrypt
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy import select
-from sqlalchemy.ext.asyncio import AsyncSession
-from utils.database import get_db
+from utils.database import async_session
 import os
 from dotenv import load_dotenv
 
@@ -14,29 +17,59 @@ load_dotenv()
 SECRET_KEY = os.getenv("SECRET_KEY", "fallback-secret-key-change-me")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
+# bcrypt work factor for new hashes (existing hashes keep the cost they were created with)
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
 
+# Authenticated-user cache: skip the per-request User SELECT (and the DB connection
+# checkout) for recently seen tokens. LRU, keyed by (email, jti).
+_user_cache: OrderedDict[tuple[str, str | None], tuple["AuthenticatedUser", float]] = OrderedDict()
+_USER_CACHE_TTL = 60  # seconds
+_USER_CACHE_MAX = 10_000
+
+
+@dataclass(frozen=True)
+class AuthenticatedUser:
+    """Lightweight, session-independent view of the logged-in user."""
+    id: int
+    email: str
+    username: str
+
 
 def hash_password(password: str) -> str:
-    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
+    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt(rounds=BCRYPT_ROUNDS)).decode("utf-8")
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return bcrypt.checkpw(plain_password.encode("utf-8"), hashed_password.encode("utf-8"))
 
 
+async def hash_password_async(password: str) -> str:
+    """Run the CPU-bound bcrypt hash in a worker thread so it doesn't block the event loop."""
+    return await asyncio.to_thread(hash_password, password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Run the CPU-bound bcrypt check in a worker thread so it doesn't block the event loop."""
+    return await asyncio.to_thread(verify_password, plain_password, hashed_password)
+
+
 def create_access_token(data: dict) -> str:
     to_encode = data.copy()
-    expire = datetime.now(timezone.utc) + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    to_encode.update({"exp": expire})
+    # JWT NumericDate: plain epoch seconds, no datetime objects needed
+    to_encode["exp"] = int(time.time()) + ACCESS_TOKEN_EXPIRE_MINUTES * 60
+    to_encode["jti"] = uuid4().hex
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
 
-async def get_current_user(
-    token: str = Depends(oauth2_scheme),
-    db: AsyncSession = Depends(get_db),
-):
+def invalidate_cached_user(email: str) -> None:
+    """Drop every cached entry for ``email``; call after the account is changed or deleted."""
+    for key in [k for k in _user_cache if k[0] == email]:
+        del _user_cache[key]
+
+
+async def get_current_user(token: str = Depends(oauth2_scheme)) -> AuthenticatedUser:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -50,10 +83,49 @@ async def get_current_user(
     except JWTError:
         raise credentials_exception
 
+    # --- Check cache first ---
+    cache_key = (email, payload.get("jti"))
+    cached = _user_cache.get(cache_key)
+    if cached is not None:
+        cached_user, cached_at = cached
+        if time.time() - cached_at < _USER_CACHE_TTL:
+            _user_cache.move_to_end(cache_key)
+            return cached_user
+        del _user_cache[cache_key]  # expired
+
     from models.user import User
 
-    result = await db.execute(select(User).where(User.email == email))
-    user = result.scalar_one_or_none()
+    # Only check out a connection on a cache miss
+    async with async_session() as db:
+        result = await db.execute(select(User).where(User.email == email))
+        user = result.scalar_one_or_none()
     if user is None:
         raise credentials_exception
-    return user
+
+    auth_user = AuthenticatedUser(id=user.id, email=user.email, username=user.username)
+    _user_cache[cache_key] = (auth_user, time.time())
+    if len(_user_cache) > _USER_CACHE_MAX:
+        _user_cache.popitem(last=False)  # drop the least recently used entry
+    return auth_user
+
+
+async def get_current_user_id(token: str = Depends(oauth2_scheme)) -> int:
+    """Lightweight auth dependency: verify the JWT and return the embedded user id.
+
+    No DB round-trip — use this on routes that only need ``current_user.id``.
+    Keep ``get_current_user`` where the full user record is required.
+    """
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        user_id = payload.get("uid")
+        if user_id is None:
+            raise credentials_exception  # token issued before uid was embedded
+    except JWTError:
+        raise credentials_exception
+    return int(user_id)
+
@@ -1,31 +1,57 @@
 import os
+import re
+import logging
 import time
-import json
+import asyncio
 import hashlib
-from groq import Groq
+import httpx
+from typing import AsyncIterator
+from groq import AsyncGroq, RateLimitError
 from dotenv import load_dotenv
-from datetime import datetime
+
+from utils.rate_limiter import AIMDRateLimiter
+from utils.response_cache import TTLLRUCache
+from utils.shared_cache import shared_cache
 
 load_dotenv()
 
-# Support multiple comma-separated API keys for rotation
-_api_keys = [k.strip() for k in os.getenv("GROQ_API_KEY", "").split(",") if k.strip()]
-_current_key_index = 0
+__all__ = [
+    "QuotaExceededError",
+    "MODEL_NAME",
+    "BROWSER_SEARCH_MODEL",
+    "get_groq_response",
+    "get_groq_response_stream",
+    "get_groq_responses_batch",
+    "get_groq_browser_search_response",
+    "get_gemini_response",
+    "get_gemini_response_stream",
+    "close_http_client",
+]
+
+log = logging.getLogger(__name__)
+
 _call_count = 0
 
-# Rate limiting: enforce minimum gap between API calls (seconds)
-_MIN_REQUEST_GAP = 2  # Groq free tier is generous, but stay safe
-_last_request_time = 0.0
+# Rate limiting: adaptive concurrency + sliding-window RPM, driven by 429s and
+# Groq's x-ratelimit-* / retry-after headers (replaces the fixed 2s gap)
+_RPM_LIMIT = int(os.getenv("GROQ_RPM_LIMIT", "30"))  # Groq free tier: 30 RPM
 
-# Response cache: avoid re-calling for identical prompts
-_response_cache: dict[str, tuple[str, float]] = {}  # hash → (response, timestamp)
-_CACHE_TTL = 600  # cache responses for 10 minutes
+# Response cache: process-wide SQLite store shared by all workers and LLM clients
+_response_cache = shared_cache  # hash → response (10 minute TTL)
+
+# Browser search results: a short TTL is still "fresh enough", and absorbs the
+# identical re-queries UIs fire on refresh / navigation
+_browser_search_cache = TTLLRUCache(maxsize=128, ttl=60)
 
 MODEL_NAME = "llama-3.3-70b-versatile"
 BROWSER_SEARCH_MODEL = "openai/gpt-oss-20b"
 
-# Create client
-_client = Groq(api_key=_api_keys[0]) if _api_keys else None
+# Shared async HTTP transport — key rotation swaps the API key, not the connection pool
+_http_client = httpx.AsyncClient(
+    timeout=httpx.Timeout(120.0, connect=10.0),
+    limits=httpx.Limits(max_connections=32, max_keepalive_connections=16, keepalive_expiry=60.0),
+)
+
 
 
 class QuotaExceededError(Exception):
@@ -33,64 +59,122 @@ class QuotaExceededError(Exception):
     pass
 
 
-def _rotate_key():
-    """Switch to the next API key. Returns True if a new key is available."""
-    global _current_key_index, _client
-    if len(_api_keys) <= 1:
-        return False
-    _current_key_index = (_current_key_index + 1) % len(_api_keys)
-    _client = Groq(api_key=_api_keys[_current_key_index])
-    print(f"Rotated to API key #{_current_key_index + 1}")
-    return True
+class _KeyPool:
+    """The configured API keys, each with its own AsyncGroq client (sharing one
+    transport) and its own rate limiter, plus the rotation cursor.
+
+    Per-key limiters mean rotating to a fresh key isn't held back by the exhausted
+    key's window / back-off. Callers pick a key index once per attempt and use
+    that index's client *and* limiter, so a concurrent rotation can't split them.
+    """
+
+    def __init__(self, keys: list[str], http_client: httpx.AsyncClient, rpm: int):
+        self.keys = keys
+        self.clients = [AsyncGroq(api_key=k, http_client=http_client) for k in keys]
+        self.limiters = [
+            AIMDRateLimiter(rpm=rpm, shared_window=shared_cache, name=f"groq:{i}")
+            for i in range(len(keys))
+        ]
+        self.current = 0
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def rotate(self) -> bool:
+        """Switch to the next API key. Returns True if a new key is available."""
+        if len(self.keys) <= 1:
+            return False
+        self.current = (self.current + 1) % len(self.keys)
+        log.warning("[GROQ] Rotated to API key #%d", self.current + 1)
+        return True
+
+
+# Support multiple comma-separated API keys for rotation
+_keys = _KeyPool(
+    [k.strip() for k in os.getenv("GROQ_API_KEY", "").split(",") if k.strip()],
+    _http_client,
+    _RPM_LIMIT,
+)
+
+
+async def close_http_client():
+    """Close the shared Groq HTTP transport (called on app shutdown)."""
+    await _http_client.aclose()
+
+
+def _is_rate_limit(e: Exception) -> bool:
+    """True for a Groq 429, judged by exception type / status code rather than by
+    matching words like "limit" in the message (which also hit e.g. context-length errors)."""
+    return isinstance(e, RateLimitError) or getattr(e, "status_code", None) == 429
+
+
+def _error_headers(e: Exception):
+    """Response headers attached to an SDK error (e.g. groq.RateLimitError), if any."""
+    response = getattr(e, "response", None)
+    return getattr(response, "headers", None)
+
+
+_BLANK_LINES_RE = re.compile(r"\n\s*\n")
+
+
+def _hash_normalized(h, text: str):
+    """Feed `text` to the hash with outer whitespace stripped and runs of blank lines
+    collapsed to one. Other whitespace (indentation, table / code layout) is kept,
+    and the text is hashed piece by piece instead of through a normalized copy."""
+    text = text.strip()
+    pos = 0
+    for m in _BLANK_LINES_RE.finditer(text):
+        h.update(text[pos:m.start()].encode())
+        h.update(b"\n\n")
+        pos = m.end()
+    h.update(text[pos:].encode())
 
 
 def _cache_key(system_prompt: str, user_prompt: str) -> str:
-    """Generate a cache key from prompts."""
-    raw = f"{system_prompt}|||{user_prompt}"
-    return hashlib.sha256(raw.encode()).hexdigest()
+    """Generate a cache key from prompts (namespaced by model in the shared cache).
+    blake2b-128 is plenty for a cache key and much cheaper than SHA-256.
+    Prompts differing only in surrounding whitespace or extra blank lines share a key."""
+    h = hashlib.blake2b(digest_size=16)
+    _hash_normalized(h, system_prompt)
+    h.update(b"\x00")
+    _hash_normalized(h, user_prompt)
+    return f"{MODEL_NAME}:" + h.hexdigest()
 
 
-def get_groq_response(system_prompt: str, user_prompt: str) -> str:
+async def get_groq_response(system_prompt: str, user_prompt: str, key_index: int | None = None) -> str:
     """Call Groq Llama 3.3 70B with a system instruction and user prompt.
-    Includes rate limiting, caching, retry with backoff, and key rotation."""
-    global _call_count, _last_request_time
+    Includes rate limiting, caching, retry with backoff, and key rotation.
+    `key_index` pins the first attempt to a specific API key (used by the batch API)."""
+    global _call_count
 
-    if not _client:
+    if not _keys:
         raise QuotaExceededError("No GROQ_API_KEY configured in .env")
 
     # --- Check cache first ---
     cache_k = _cache_key(system_prompt, user_prompt)
-    if cache_k in _response_cache:
-        cached_response, cached_at = _response_cache[cache_k]
-        if time.time() - cached_at < _CACHE_TTL:
-            print(f"\n[GROQ CACHE HIT] {datetime.now().strftime('%H:%M:%S')} — returning cached response")
-            return cached_response
-        else:
-            del _response_cache[cache_k]  # expired
+    cached_response = await _response_cache.aget(cache_k)
+    if cached_response is not None:
+        log.debug("[GROQ CACHE HIT] returning cached response")
+        return cached_response
 
     _call_count += 1
     total_chars = len(system_prompt) + len(user_prompt)
-    print(f"\n[GROQ CALL #{_call_count}] {datetime.now().strftime('%H:%M:%S')}")
-    print(f"  Model: {MODEL_NAME}")
-    print(f"  System prompt: {len(system_prompt)} chars")
-    print(f"  User prompt: {len(user_prompt)} chars")
-    print(f"  Total: {total_chars} chars (~{total_chars // 4} tokens)")
-
-    # --- Rate limiting: wait if too soon since last call ---
-    elapsed = time.time() - _last_request_time
-    if elapsed < _MIN_REQUEST_GAP:
-        wait_time = _MIN_REQUEST_GAP - elapsed
-        print(f"  Rate limiter: waiting {wait_time:.1f}s before calling API")
-        time.sleep(wait_time)
+    log.debug(
+        "[GROQ CALL #%d] model=%s system=%d chars user=%d chars total=%d chars (~%d tokens)",
+        _call_count, MODEL_NAME, len(system_prompt), len(user_prompt), total_chars, total_chars // 4,
+    )
 
     tried_keys = 0
     max_retries = 2  # retry up to 2 times on 429
+    key = _keys.current if key_index is None else key_index % len(_keys)
 
-    while tried_keys < len(_api_keys):
+    while tried_keys < len(_keys):
         for attempt in range(max_retries + 1):
+            limiter = _keys.limiters[key]
+            await limiter.acquire()  # waits for a concurrency slot / RPM window / retry-after
             try:
-                _last_request_time = time.time()
-                chat_completion = _client.chat.completions.create(
+                started = time.monotonic()
+                raw_response = await _keys.clients[key].chat.completions.with_raw_response.create(
                     messages=[
                         {"role": "system", "content": system_prompt},
                         {"role": "user", "content": user_prompt},
@@ -100,57 +184,165 @@ def get_groq_response(system_prompt: str, user_prompt: str) -> str:
                     max_completion_tokens=1024,
                     top_p=0.9,
                 )
+                chat_completion = raw_response.parse()
+                limiter.record_success(time.monotonic() - started, raw_response.headers)
                 result = chat_completion.choices[0].message.content
                 # Store in cache
-                _response_cache[cache_k] = (result, time.time())
+                await _response_cache.aset(cache_k, result)
                 return result
             except Exception as e:
-                error_msg = str(e)
-                is_rate_limit = "429" in error_msg or "rate" in error_msg.lower() or "quota" in error_msg.lower() or "limit" in error_msg.lower()
+                is_rate_limit = _is_rate_limit(e)
+                if is_rate_limit:
+                    # Next acquire() waits for retry-after, else a jittered back-off
+                    limiter.record_throttle(_error_headers(e), fallback_delay=(attempt + 1) * 5)
                 if is_rate_limit and attempt < max_retries:
-                    backoff = (attempt + 1) * 5  # 5s, then 10s
-                    print(f"  429 rate limit — retrying in {backoff}s (attempt {attempt + 1}/{max_retries})")
-                    time.sleep(backoff)
+                    log.warning("[GROQ] 429 rate limit — retrying (attempt %d/%d)", attempt + 1, max_retries)
                     continue
                 elif is_rate_limit:
                     tried_keys += 1
-                    if _rotate_key():
+                    if _keys.rotate():
+                        key = _keys.current
                         break  # break inner for-loop, continue outer while
                     raise QuotaExceededError(
                         "Rate limit exceeded. Please wait a minute before trying again."
                     )
                 raise  # non-rate-limit error
+            finally:
+                await limiter.release()
         else:
             tried_keys += 1
-            if not _rotate_key():
+            if not _keys.rotate():
                 raise QuotaExceededError(
                     "Rate limit exceeded. Please wait a minute before trying again."
                 )
+            key = _keys.current
 
     raise QuotaExceededError(
         "All API keys exhausted. Please wait a minute or add more keys to GROQ_API_KEY in .env (comma-separated)."
     )
 
 
-def get_groq_browser_search_response(user_query: str) -> str:
-    """Call Groq with browser_search tool using openai/gpt-oss-20b model.
-    Returns real-time web research with citations. No caching (results should be fresh)."""
-    global _call_count, _last_request_time
+async def get_groq_responses_batch(pairs: list[tuple[str, str]]) -> list[str]:
+    """Run independent (system_prompt, user_prompt) pairs concurrently; results keep input order.
+    Identical pairs are sent once, cache hits return without a slot, and requests are
+    spread round-robin across API keys so each key's RPM budget is used in parallel."""
+    if not _keys:
+        raise QuotaExceededError("No GROQ_API_KEY configured in .env")
+
+    unique = list(dict.fromkeys(pairs))
+    start = _keys.current
+    results = await asyncio.gather(*(
+        get_groq_response(system_prompt, user_prompt, key_index=start + i)
+        for i, (system_prompt, user_prompt) in enumerate(unique)
+    ))
+    by_pair = dict(zip(unique, results))
+    return [by_pair[pair] for pair in pairs]
 
-    if not _client:
+
+async def get_groq_response_stream(system_prompt: str, user_prompt: str) -> AsyncIterator[str]:
+    """Streaming variant of get_groq_response: yields text deltas as Groq generates them.
+    Retries / key rotation only happen before the first token is sent; the full
+    text is cached once the stream completes. Internal pipelines that need the
+    complete string should keep using get_groq_response."""
+    global _call_count
+
+    if not _keys:
         raise QuotaExceededError("No GROQ_API_KEY configured in .env")
 
+    cache_k = _cache_key(system_prompt, user_prompt)
+    cached_response = await _response_cache.aget(cache_k)
+    if cached_response is not None:
+        log.debug("[GROQ CACHE HIT] returning cached response")
+        yield cached_response
+        return
+
     _call_count += 1
-    print(f"\n[GROQ BROWSER SEARCH #{_call_count}] {datetime.now().strftime('%H:%M:%S')}")
-    print(f"  Model: {BROWSER_SEARCH_MODEL}")
-    print(f"  Query: {user_query[:100]}...")
+    log.debug(
+        "[GROQ STREAM #%d] model=%s total=%d chars",
+        _call_count, MODEL_NAME, len(system_prompt) + len(user_prompt),
+    )
+
+    tried_keys = 0
+    max_retries = 2
+
+    while tried_keys < len(_keys):
+        for attempt in range(max_retries + 1):
+            key = _keys.current
+            limiter = _keys.limiters[key]
+            await limiter.acquire()
+            parts: list[str] = []
+            try:
+                started = time.monotonic()
+                raw_response = await _keys.clients[key].chat.completions.with_raw_response.create(
+                    messages=[
+                        {"role": "system", "content": system_prompt},
+                        {"role": "user", "content": user_prompt},
+                    ],
+                    model=MODEL_NAME,
+                    temperature=0.3,
+                    max_completion_tokens=1024,
+                    top_p=0.9,
+                    stream=True,
+                )
+                stream = raw_response.parse()
+                async for chunk in stream:
+                    if not chunk.choices:
+                        continue
+                    delta = chunk.choices[0].delta.content
+                    if delta:
+                        parts.append(delta)
+                        yield delta
+                limiter.record_success(time.monotonic() - started, raw_response.headers)
+                if parts:  # never cache an empty completion
+                    await _response_cache.aset(cache_k, "".join(parts))
+                return
+            except Exception as e:
+                if parts:
+                    raise  # already streamed to the caller — can't transparently retry
+                is_rate_limit = _is_rate_limit(e)
+                if is_rate_limit:
+                    limiter.record_throttle(_error_headers(e), fallback_delay=(attempt + 1) * 5)
+                if is_rate_limit and attempt < max_retries:
+                    log.warning("[GROQ] 429 rate limit — retrying (attempt %d/%d)", attempt + 1, max_retries)
+                    continue
+                elif is_rate_limit:
+                    tried_keys += 1
+                    if _keys.rotate():
+                        break
+                    raise QuotaExceededError(
+                        "Rate limit exceeded. Please wait a minute before trying again."
+                    )
+                raise
+            finally:
+                await limiter.release()
+        else:
+            tried_keys += 1
+            if not _keys.rotate():
+                raise QuotaExceededError(
+                    "Rate limit exceeded. Please wait a minute before trying again."
+                )
+
+    raise QuotaExceededError(
+        "All API keys exhausted. Please wait a minute or add more keys to GROQ_API_KEY in .env (comma-separated)."
+    )
 
-    # --- Rate limiting ---
-    elapsed = time.time() - _last_request_time
-    if elapsed < _MIN_REQUEST_GAP:
-        wait_time = _MIN_REQUEST_GAP - elapsed
-        print(f"  Rate limiter: waiting {wait_time:.1f}s before calling API")
-        time.sleep(wait_time)
+
+async def get_groq_browser_search_response(user_query: str) -> str:
+    """Call Groq with browser_search tool using openai/gpt-oss-20b model.
+    Returns real-time web research with citations. Cached for only 60s so results stay fresh."""
+    global _call_count
+
+    if not _keys:
+        raise QuotaExceededError("No GROQ_API_KEY configured in .env")
+
+    cache_k = hashlib.blake2b(user_query.encode(), digest_size=16).digest()  # raw 16-byte key, in-process only
+    cached_response = _browser_search_cache.get(cache_k)
+    if cached_response is not None:
+        log.debug("[GROQ BROWSER SEARCH CACHE HIT] returning cached response")
+        return cached_response
+
+    _call_count += 1
+    log.debug("[GROQ BROWSER SEARCH #%d] model=%s query=%.100s", _call_count, BROWSER_SEARCH_MODEL, user_query)
 
     system_prompt = (
         "You are an expert research assistant with access to real-time web search. "
@@ -164,11 +356,14 @@ def get_groq_browser_search_response(user_query: str) -> str:
     tried_keys = 0
     max_retries = 2
 
-    while tried_keys < len(_api_keys):
+    while tried_keys < len(_keys):
         for attempt in range(max_retries + 1):
+            key = _keys.current
+            limiter = _keys.limiters[key]
+            await limiter.acquire()
             try:
-                _last_request_time = time.time()
-                chat_completion = _client.chat.completions.create(
+                started = time.monotonic()
+                raw_response = await _keys.clients[key].chat.completions.with_raw_response.create(
                     model=BROWSER_SEARCH_MODEL,
                     messages=[
                         {"role": "system", "content": system_prompt},
@@ -176,73 +371,72 @@ def get_groq_browser_search_response(user_query: str) -> str:
                     ],
                     tools=[{"type": "browser_search"}],
                     temperature=0.3,
-                    max_completion_tokens=8192,
+                    # Room for the tool output + reasoning *and* the answer, so the
+                    # empty-content (finish_reason=length) follow-up below is rare
+                    max_completion_tokens=16384,
                 )
+                chat_completion = raw_response.parse()
+                limiter.record_success(time.monotonic() - started, raw_response.headers)
 
                 message = chat_completion.choices[0].message
                 finish_reason = chat_completion.choices[0].finish_reason
-                print(f"  Response finish_reason: {finish_reason}")
-                print(f"  Message content length: {len(message.content) if message.content else 0}")
+                log.debug(
+                    "[GROQ BROWSER SEARCH] finish_reason=%s content=%d chars",
+                    finish_reason, len(message.content) if message.content else 0,
+                )
 
                 result = message.content
 
                 # If content is empty (e.g. finish_reason=length), extract search
-                # results from executed_tools on the *message* object and do a
-                # follow-up call so the model can synthesise a proper answer.
+                # results from executed_tools on the *message* object; a follow-up
+                # call below lets the model synthesise a proper answer from them.
+                search_context = ""
                 if not result:
-                    search_context = ""
+                    if log.isEnabledFor(logging.DEBUG):
+                        # pydantic serialises straight to JSON; only built when debugging
+                        log.debug("[GROQ BROWSER SEARCH] empty content, raw: %s", chat_completion.model_dump_json()[:2000])
                     # executed_tools lives on the message, not the top-level response
                     executed = getattr(message, 'executed_tools', None)
                     if executed:
-                        print(f"  Extracting search context from {len(executed)} executed_tools")
+                        log.debug("[GROQ BROWSER SEARCH] extracting context from %d executed_tools", len(executed))
                         parts = []
                         for et in executed:
                             output = getattr(et, 'output', None)
                             if output:
                                 parts.append(str(output))
                         search_context = "\n".join(parts)
-
-                    if search_context:
-                        # Make a follow-up call with the search results as context
-                        print(f"  Making follow-up call with {len(search_context)} chars of search context")
-                        _last_request_time = time.time()
-                        followup = _client.chat.completions.create(
-                            model=BROWSER_SEARCH_MODEL,
-                            messages=[
-                                {"role": "system", "content": system_prompt},
-                                {"role": "user", "content": user_query},
-                                {"role": "assistant", "content": f"I searched the web and found the following results:\n{search_context}"},
-                                {"role": "user", "content": "Based on these search results, please provide a comprehensive answer to the original query with citations."},
-                            ],
-                            temperature=0.3,
-                            max_completion_tokens=4096,
-                        )
-                        result = followup.choices[0].message.content
-
-                if not result:
-                    result = "Browser search returned no content. Please try rephrasing your query."
-
-                print(f"  Browser search completed — {len(result)} chars returned")
-                return result
             except Exception as e:
-                error_msg = str(e)
-                is_rate_limit = "429" in error_msg or "rate" in error_msg.lower() or "quota" in error_msg.lower() or "limit" in error_msg.lower()
+                is_rate_limit = _is_rate_limit(e)
+                if is_rate_limit:
+                    limiter.record_throttle(_error_headers(e), fallback_delay=(attempt + 1) * 5)
                 if is_rate_limit and attempt < max_retries:
-                    backoff = (attempt + 1) * 5
-                    print(f"  429 rate limit — retrying in {backoff}s (attempt {attempt + 1}/{max_retries})")
-                    time.sleep(backoff)
+                    log.warning("[GROQ] 429 rate limit — retrying (attempt %d/%d)", attempt + 1, max_retries)
                     continue
                 elif is_rate_limit:
                     tried_keys += 1
-                    if _rotate_key():
+                    if _keys.rotate():
                         break
                     raise QuotaExceededError(
                         "Rate limit exceeded. Please wait a minute before trying again."
                     )
                 raise
+            finally:
+                await limiter.release()
+
+            # Only reached after a successful search call, with its slot released
+            if not result and search_context:
+                result = await _browser_search_followup(key, system_prompt, user_query, search_context)
+
+            if not result:
+                result = "Browser search returned no content. Please try rephrasing your query."
+            else:
+                _browser_search_cache.set(cache_k, result)
+
+            log.debug("[GROQ BROWSER SEARCH] completed — %d chars", len(result))
+            return result
         else:
             tried_keys += 1
-            if not _rotate_key():
+            if not _keys.rotate():
                 raise QuotaExceededError(
                     "Rate limit exceeded. Please wait a minute before trying again."
                 )
@@ -252,5 +446,40 @@ def get_groq_browser_search_response(user_query: str) -> str:
     )
 
 
+async def _browser_search_followup(key: int, system_prompt: str, user_query: str, search_context: str) -> str | None:
+    """Ask the model to answer from already-executed search results. Goes through the
+    key's limiter like any other call, so it counts against the RPM window and a 429
+    feeds the AIMD back-off."""
+    log.debug("[GROQ BROWSER SEARCH] follow-up call with %d chars of context", len(search_context))
+    limiter = _keys.limiters[key]
+    await limiter.acquire()
+    try:
+        started = time.monotonic()
+        raw_response = await _keys.clients[key].chat.completions.with_raw_response.create(
+            model=BROWSER_SEARCH_MODEL,
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_query},
+                {"role": "assistant", "content": f"I searched the web and found the following results:\n{search_context}"},
+                {"role": "user", "content": "Based on these search results, please provide a comprehensive answer to the original query with citations."},
+            ],
+            temperature=0.3,
+            max_completion_tokens=4096,
+        )
+        followup = raw_response.parse()
+        limiter.record_success(time.monotonic() - started, raw_response.headers)
+        return followup.choices[0].message.content
+    except Exception as e:
+        if _is_rate_limit(e):
+            limiter.record_throttle(_error_headers(e), fallback_delay=5)
+            raise QuotaExceededError(
+                "Rate limit exceeded. Please wait a minute before trying again."
+            )
+        raise
+    finally:
+        await limiter.release()
+
+
 # Backward-compatible alias so callers don't need to change function names everywhere
 get_gemini_response = get_groq_response
+get_gemini_response_stream = get_groq_response_stream
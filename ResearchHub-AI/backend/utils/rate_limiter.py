@@ -0,0 +1,177 @@
+"""
+Adaptive rate limiter for LLM API calls.
+
+Replaces the old fixed "minimum gap between calls" throttle with:
+  - AIMD concurrency: +increase per successful call, ×decrease on a 429
+  - a 60s sliding window capping requests per minute (optionally shared
+    across worker processes)
+  - provider hints (retry-after, x-ratelimit-* headers) that push back the
+    earliest time the next request may start
+
+Usage:
+    limiter = AIMDRateLimiter(rpm=30)
+    await limiter.acquire()
+    try:
+        ...call API...
+        limiter.record_success(latency, response_headers)
+    except RateLimitError as e:
+        limiter.record_throttle(e.response.headers, fallback_delay=5)
+    finally:
+        await limiter.release()
+"""
+
+import re
+import random
+import asyncio
+import time
+from collections import deque
+from typing import Mapping
+
+_WINDOW_SECONDS = 60.0
+_MAX_BACKOFF = 30.0  # cap for jittered fallback back-off when no retry-after is given
+_DURATION_PART_RE = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_DURATION_UNITS = {"h": 3600.0, "m": 60.0, "s": 1.0, "ms": 0.001}
+
+
+def parse_duration(value: str | None) -> float | None:
+    """Parse a provider duration ("7.66s", "2m59.56s", "120ms", or bare seconds) into seconds."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    parts = _DURATION_PART_RE.findall(value)
+    if not parts:
+        return None
+    return sum(float(num) * _DURATION_UNITS[unit] for num, unit in parts)
+
+
+def retry_after_from_headers(headers: Mapping[str, str] | None) -> float | None:
+    """Seconds the provider asks us to wait, from retry-after or exhausted x-ratelimit-* headers."""
+    if not headers:
+        return None
+    retry_after = parse_duration(headers.get("retry-after"))
+    if retry_after is not None:
+        return retry_after
+    waits = []
+    for kind in ("requests", "tokens"):
+        if headers.get(f"x-ratelimit-remaining-{kind}") == "0":
+            reset = parse_duration(headers.get(f"x-ratelimit-reset-{kind}"))
+            if reset is not None:
+                waits.append(reset)
+    return max(waits) if waits else None
+
+
+class AIMDRateLimiter:
+    """asyncio AIMD concurrency limiter with a sliding-window RPM cap."""
+
+    def __init__(
+        self,
+        rpm: int,
+        min_concurrency: float = 1.0,
+        max_concurrency: float = 8.0,
+        initial_concurrency: float = 4.0,
+        increase: float = 0.5,
+        decrease: float = 0.5,
+        shared_window=None,
+        name: str = "default",
+    ):
+        self.rpm = rpm
+        # Optional cross-process RPM window (e.g. shared_cache.SharedCache) so all
+        # workers count against the same per-minute quota
+        self.shared_window = shared_window
+        self.name = name
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.increase = increase
+        self.decrease = decrease
+        # Start at a moderate level; min_concurrency is only the floor reached after 429s
+        self.concurrency = min(max(initial_concurrency, min_concurrency), max_concurrency)
+        self.latency_ema: float | None = None  # smoothed call latency, for diagnostics
+
+        self._cond = asyncio.Condition()
+        self._window: deque[float] = deque()  # start times of calls in the last 60s
+        self._in_flight = 0
+        self._not_before = 0.0  # monotonic time before which no call may start
+
+    def _wait_time(self, now: float) -> float | None:
+        """0.0 if a call may start now, seconds to wait, or None to wait for a release."""
+        while self._window and now - self._window[0] >= _WINDOW_SECONDS:
+            self._window.popleft()
+        if self._in_flight >= int(self.concurrency):
+            return None
+        waits = [0.0]
+        if len(self._window) >= self.rpm:
+            waits.append(self._window[0] + _WINDOW_SECONDS - now)
+        if self._not_before > now:
+            waits.append(self._not_before - now)
+        return max(waits)
+
+    async def acquire(self):
+        """Wait until a call may start, then reserve a concurrency slot."""
+        while True:
+            async with self._cond:
+                while True:
+                    now = time.monotonic()
+                    wait = self._wait_time(now)
+                    if wait == 0.0:
+                        break
+                    try:
+                        await asyncio.wait_for(self._cond.wait(), timeout=wait)
+                    except asyncio.TimeoutError:
+                        pass  # re-check the window / back-off deadline
+                self._in_flight += 1
+                self._window.append(now)
+            if self.shared_window is None:
+                return
+
+            # The cross-process window is checked outside the lock, so a slow
+            # database only delays this caller, not every waiter on the limiter
+            try:
+                wait = await self.shared_window.areserve_request(self.name, self.rpm)
+            except BaseException:
+                await self.release()  # cancelled mid-check: don't leak the slot
+                raise
+            if wait == 0.0:
+                return
+            # Shared quota is full: hand the local slot back and hold every
+            # local caller off until the shared window frees up
+            async with self._cond:
+                self._in_flight -= 1
+                self._window.remove(now)
+                self._not_before = max(self._not_before, time.monotonic() + wait)
+                self._cond.notify_all()
+
+    async def release(self):
+        """Free the slot reserved by acquire() and wake waiters."""
+        async with self._cond:
+            self._in_flight -= 1
+            self._cond.notify_all()
+
+    # record_* only touch plain attributes from the event-loop thread, so they need
+    # no lock; waiters pick up the new state on their next wake-up in release()/timeout.
+
+    def record_success(self, latency: float, headers: Mapping[str, str] | None = None):
+        """Additive increase; also honours quota headers on successful responses."""
+        self.concurrency = min(self.max_concurrency, self.concurrency + self.increase)
+        self.latency_ema = latency if self.latency_ema is None else 0.8 * self.latency_ema + 0.2 * latency
+        wait = retry_after_from_headers(headers)
+        if wait:
+            self._not_before = max(self._not_before, time.monotonic() + wait)
+
+    def record_throttle(self, headers: Mapping[str, str] | None = None, fallback_delay: float = 5.0):
+        """Multiplicative decrease and push back the next start by retry-after (or fallback_delay).
+
+        Both are jittered so workers throttled at the same moment don't all retry in
+        lockstep: retry-after gets up to +10%, the fallback uses decorrelated jitter
+        uniform(0.5, min(30, 3 × fallback_delay)).
+        """
+        self.concurrency = max(self.min_concurrency, self.concurrency * self.decrease)
+        wait = retry_after_from_headers(headers)
+        if wait is None:
+            wait = random.uniform(0.5, min(_MAX_BACKOFF, fallback_delay * 3))
+        else:
+            wait += random.uniform(0.0, wait * 0.1 + 0.25)
+        self._not_before = max(self._not_before, time.monotonic() + wait)
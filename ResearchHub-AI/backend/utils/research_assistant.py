@@ -1,4 +1,62 @@
-from utils.groq_client import get_gemini_response
+import asyncio
+from typing import AsyncIterator
+
+from utils.groq_client import get_gemini_response, get_gemini_response_stream, get_groq_responses_batch
+
+
+RESEARCH_SYSTEM_PROMPT = (
+    "You are an expert AI Research Assistant embedded in a research workspace. "
+    "Your primary job is to help researchers deeply understand the papers they have uploaded. "
+    "You have access to the full text and metadata of these papers.\n\n"
+    "Do NOT restate or echo the user's question. Jump straight into the answer.\n\n"
+    "RESPONSE GUIDELINES:\n"
+    "1. *Be specific, not generic.* Every claim you make must reference concrete details "
+    "(section numbers, figure/table references, specific results) from the provided papers.\n"
+    "2. *Cite equations.* When the user's question involves methodology, derivations, models, "
+    "or quantitative relationships, you MUST reproduce the relevant equations from the paper "
+    "using LaTeX notation (e.g., $E = mc^2$). Reference the equation number if available "
+    "(e.g., \"Eq. 3 in [Author, Title]\"). If the paper defines variables, state what each "
+    "variable represents.\n"
+    "3. *Cite precisely.* Use the format [Author(s), Paper Title] when referencing a paper. "
+    "When referencing a specific part, add section/page info: [Author, Title, §3.2].\n"
+    "4. *Adapt your depth to the question.* For simple factual questions, give a concise "
+    "answer with a citation. For complex analytical questions, provide a thorough breakdown.\n"
+    "5. *Compare across papers* when the user asks about a concept covered by multiple papers. "
+    "Highlight agreements, contradictions, and complementary perspectives.\n\n"
+    "STRUCTURE (use only the sections relevant to the query — not every section is needed every time):\n\n"
+    "## 📊 Key Findings\n"
+    "Bullet-point the most important findings with citations and data.\n\n"
+    "## 🔬 Detailed Analysis\n"
+    "In-depth synthesis. Include equations (LaTeX), methodology details, and variable definitions "
+    "from the papers. Use sub-headings for clarity.\n\n"
+    "## 📐 Relevant Equations\n"
+    "If the query involves any quantitative or mathematical content, list all relevant equations "
+    "from the papers here. For each equation:\n"
+    "- Write it in LaTeX: $...$\n"
+    "- State the equation number and source: (Eq. X, [Author, Title])\n"
+    "- Briefly explain what the equation represents and define key variables.\n"
+    "If no equations are relevant, omit this section entirely.\n\n"
+    "## 📎 Sources & Citations\n"
+    "List referenced papers with title, authors, and a one-line relevance note.\n\n"
+    "## 💡 Further Research Suggestions\n"
+    "Suggest 2-3 follow-up questions or research directions based on the analysis.\n\n"
+    "RULES:\n"
+    "- Always ground your answers in the provided paper context — do not hallucinate.\n"
+    "- If the context lacks relevant information, explicitly state: "
+    "\"⚠️ The provided papers do not contain enough information to fully answer this query.\"\n"
+    "- Prefer reproducing the paper's own notation and terminology.\n"
+    "- When a paper presents a model or algorithm, describe its steps and cite the equations.\n"
+    "- Never give a generic textbook answer when paper-specific content is available."
+)
+
+SUMMARY_SYSTEM_PROMPT = "Summarize academic papers concisely."
+# Vector-retrieval query used to pick chunks for the summarize tool (and its prefetch)
+SUMMARY_QUERY_HINT = "summarize the key points and contributions of this paper"
+COMPARE_SYSTEM_PROMPT = "You are an expert at comparative analysis of academic papers."
+FINDINGS_SYSTEM_PROMPT = "You are an expert at extracting key findings from academic research."
+
+_MAX_PREFETCH = 2  # speculative summaries in flight at once (they share the rate limiter)
+_prefetch_tasks: set[asyncio.Task] = set()  # strong refs so running tasks aren't GC'd
 
 
 class ResearchAssistant:
@@ -7,134 +65,132 @@ class ResearchAssistant:
 
     def create_research_context(self, papers, query: str, retrieved_chunks: dict[int, list[str]] | None = None) -> str:
         """Build structured context from papers for the AI prompt.
-        Uses vector-retrieved chunks when available, falls back to abstract."""
-        context_parts = []
-        for paper in papers:
-            paper_context = f"""
-Title: {paper.title}
-Authors: {paper.authors or 'N/A'}
-Abstract: {paper.abstract or 'N/A'}
-"""
+        Uses vector-retrieved chunks when available, falls back to abstract.
+        Pieces are collected in one list and joined once, so long paper content
+        is copied a single time instead of on every `+=`."""
+        parts = ["Research Papers Context:\n"]
+        for i, paper in enumerate(papers):
+            if i:
+                parts.append("\n---\n")
+            parts.append(
+                f"\nTitle: {paper.title}\n"
+                f"Authors: {paper.authors or 'N/A'}\n"
+                f"Abstract: {paper.abstract or 'N/A'}\n"
+            )
             # Use vector-retrieved chunks if available for this paper
             if retrieved_chunks and paper.id in retrieved_chunks:
-                chunks = retrieved_chunks[paper.id]
-                paper_context += "Relevant Content (from vector retrieval):\n"
-                paper_context += "\n---\n".join(chunks) + "\n"
+                parts.append("Relevant Content (from vector retrieval):\n")
+                parts.append("\n---\n".join(retrieved_chunks[paper.id]))
+                parts.append("\n")
             elif paper.content:
-                paper_context += f"Full Content:\n{paper.content}\n"
-
-            context_parts.append(paper_context)
-
-        full_context = "\n---\n".join(context_parts)
-        return f"Research Papers Context:\n{full_context}\n\nUser Query: {query}"
+                parts.append("Full Content:\n")
+                parts.append(paper.content)
+                parts.append("\n")
+        parts.append(f"\n\nUser Query: {query}")
+        return "".join(parts)
 
-    def generate_research_response(self, context: str, query: str) -> str:
+    async def generate_research_response(self, context: str, query: str) -> str:
         """Call LLM with research context and return response."""
-        system_prompt = (
-            "You are an expert AI Research Assistant embedded in a research workspace. "
-            "Your primary job is to help researchers deeply understand the papers they have uploaded. "
-            "You have access to the full text and metadata of these papers.\n\n"
-            "Do NOT restate or echo the user's question. Jump straight into the answer.\n\n"
-            "RESPONSE GUIDELINES:\n"
-            "1. *Be specific, not generic.* Every claim you make must reference concrete details "
-            "(section numbers, figure/table references, specific results) from the provided papers.\n"
-            "2. *Cite equations.* When the user's question involves methodology, derivations, models, "
-            "or quantitative relationships, you MUST reproduce the relevant equations from the paper "
-            "using LaTeX notation (e.g., $E = mc^2$). Reference the equation number if available "
-            "(e.g., \"Eq. 3 in [Author, Title]\"). If the paper defines variables, state what each "
-            "variable represents.\n"
-            "3. *Cite precisely.* Use the format [Author(s), Paper Title] when referencing a paper. "
-            "When referencing a specific part, add section/page info: [Author, Title, §3.2].\n"
-            "4. *Adapt your depth to the question.* For simple factual questions, give a concise "
-            "answer with a citation. For complex analytical questions, provide a thorough breakdown.\n"
-            "5. *Compare across papers* when the user asks about a concept covered by multiple papers. "
-            "Highlight agreements, contradictions, and complementary perspectives.\n\n"
-            "STRUCTURE (use only the sections relevant to the query — not every section is needed every time):\n\n"
-            "## 📊 Key Findings\n"
-            "Bullet-point the most important findings with citations and data.\n\n"
-            "## 🔬 Detailed Analysis\n"
-            "In-depth synthesis. Include equations (LaTeX), methodology details, and variable definitions "
-            "from the papers. Use sub-headings for clarity.\n\n"
-            "## 📐 Relevant Equations\n"
-            "If the query involves any quantitative or mathematical content, list all relevant equations "
-            "from the papers here. For each equation:\n"
-            "- Write it in LaTeX: $...$\n"
-            "- State the equation number and source: (Eq. X, [Author, Title])\n"
-            "- Briefly explain what the equation represents and define key variables.\n"
-            "If no equations are relevant, omit this section entirely.\n\n"
-            "## 📎 Sources & Citations\n"
-            "List referenced papers with title, authors, and a one-line relevance note.\n\n"
-            "## 💡 Further Research Suggestions\n"
-            "Suggest 2-3 follow-up questions or research directions based on the analysis.\n\n"
-            "RULES:\n"
-            "- Always ground your answers in the provided paper context — do not hallucinate.\n"
-            "- If the context lacks relevant information, explicitly state: "
-            "\"⚠️ The provided papers do not contain enough information to fully answer this query.\"\n"
-            "- Prefer reproducing the paper's own notation and terminology.\n"
-            "- When a paper presents a model or algorithm, describe its steps and cite the equations.\n"
-            "- Never give a generic textbook answer when paper-specific content is available."
-        )
         user_prompt = f"Context:\n{context}\n\nQuestion: {query}"
-        return get_gemini_response(system_prompt, user_prompt)
+        return await get_gemini_response(RESEARCH_SYSTEM_PROMPT, user_prompt)
 
-    def summarize_paper(self, paper, retrieved_chunks: list[str] | None = None) -> str:
-        """Generate a concise summary of a single paper.
-        Uses vector-retrieved chunks when available for richer context."""
-        prompt = (
-            f"Summarize this research paper in a few paragraphs:\n\n"
+    def stream_research_response(self, context: str, query: str) -> AsyncIterator[str]:
+        """Same as generate_research_response, but yields the answer as it is generated."""
+        user_prompt = f"Context:\n{context}\n\nQuestion: {query}"
+        return get_gemini_response_stream(RESEARCH_SYSTEM_PROMPT, user_prompt)
+
+    @staticmethod
+    def _summary_prompt(paper, retrieved_chunks: list[str] | None = None) -> str:
+        """User prompt for summarizing one paper (chunks preferred over full content)."""
+        parts = [
+            "Summarize this research paper in a few paragraphs:\n\n"
             f"Title: {paper.title}\n"
             f"Authors: {paper.authors or 'N/A'}\n"
             f"Abstract: {paper.abstract or 'N/A'}"
-        )
+        ]
         if retrieved_chunks:
-            prompt += "\n\nRelevant Content (from vector retrieval):\n"
-            prompt += "\n---\n".join(retrieved_chunks)
+            parts.append("\n\nRelevant Content (from vector retrieval):\n")
+            parts.append("\n---\n".join(retrieved_chunks))
         elif paper.content:
-            prompt += f"\n\nFull Content:\n{paper.content}"
-        return get_gemini_response(
-            "Summarize academic papers concisely.",
-            prompt,
+            parts.append("\n\nFull Content:\n")
+            parts.append(paper.content)
+        return "".join(parts)
+
+    async def summarize_paper(self, paper, retrieved_chunks: list[str] | None = None) -> str:
+        """Generate a concise summary of a single paper.
+        Uses vector-retrieved chunks when available for richer context."""
+        return await get_gemini_response(
+            SUMMARY_SYSTEM_PROMPT,
+            self._summary_prompt(paper, retrieved_chunks),
         )
 
-    def compare_papers(self, papers, retrieved_chunks: dict[int, list[str]] | None = None) -> str:
-        """Compare multiple papers and identify similarities/differences.
-        Uses vector-retrieved chunks when available for deeper comparison."""
-        descriptions = []
-        for p in papers:
-            desc = f"- Title: {p.title}\n  Authors: {p.authors or 'N/A'}\n  Abstract: {p.abstract or 'N/A'}"
+    def prefetch_summaries(self, papers, retrieved_chunks: dict[int, list[str]] | None = None) -> int:
+        """Speculatively summarize the next likely papers in the background.
+        Results land in the response cache under the same key summarize_paper uses, so
+        the real request is usually a cache hit. Returns how many tasks were scheduled."""
+        retrieved_chunks = retrieved_chunks or {}
+        scheduled = 0
+        for paper in papers:
+            if len(_prefetch_tasks) >= _MAX_PREFETCH:
+                break
+            task = asyncio.create_task(self._prefetch_one(paper, retrieved_chunks.get(paper.id)))
+            _prefetch_tasks.add(task)
+            task.add_done_callback(_prefetch_tasks.discard)
+            scheduled += 1
+        return scheduled
+
+    async def _prefetch_one(self, paper, retrieved_chunks: list[str] | None):
+        try:
+            await self.summarize_paper(paper, retrieved_chunks)
+        except Exception as e:
+            print(f"[PREFETCH] Summary prefetch for paper {paper.id} failed: {e}")
+
+    async def summarize_papers(self, papers, retrieved_chunks: dict[int, list[str]] | None = None) -> str:
+        """Summarize each paper independently; the LLM calls run concurrently.
+        A single paper returns its summary as-is, several are joined under title headings."""
+        retrieved_chunks = retrieved_chunks or {}
+        summaries = await get_groq_responses_batch([
+            (SUMMARY_SYSTEM_PROMPT, self._summary_prompt(p, retrieved_chunks.get(p.id)))
+            for p in papers
+        ])
+        if len(summaries) == 1:
+            return summaries[0]
+        return "\n\n".join(f"## {p.title}\n\n{summary}" for p, summary in zip(papers, summaries))
+
+    @staticmethod
+    def _describe_papers(header: str, papers, retrieved_chunks: dict[int, list[str]] | None, include_authors: bool) -> str:
+        """`header` followed by a bullet block per paper, built as fragments and joined once."""
+        parts = [header]
+        for i, p in enumerate(papers):
+            if i:
+                parts.append("\n\n")
+            parts.append(f"- Title: {p.title}")
+            if include_authors:
+                parts.append(f"\n  Authors: {p.authors or 'N/A'}")
+            parts.append(f"\n  Abstract: {p.abstract or 'N/A'}")
             if retrieved_chunks and p.id in retrieved_chunks:
-                chunks = retrieved_chunks[p.id]
-                desc += "\n  Relevant Content:\n  " + "\n  ".join(chunks)
+                parts.append("\n  Relevant Content:\n  ")
+                parts.append("\n  ".join(retrieved_chunks[p.id]))
             elif p.content:
-                desc += f"\n  Full Content:\n  {p.content}"
-            descriptions.append(desc)
-        prompt = (
+                parts.append("\n  Full Content:\n  ")
+                parts.append(p.content)
+        return "".join(parts)
+
+    async def compare_papers(self, papers, retrieved_chunks: dict[int, list[str]] | None = None) -> str:
+        """Compare multiple papers and identify similarities/differences.
+        Uses vector-retrieved chunks when available for deeper comparison."""
+        prompt = self._describe_papers(
             "Compare and contrast the following research papers. "
-            "Identify key similarities, differences, methodologies, and findings:\n\n"
-            + "\n\n".join(descriptions)
-        )
-        return get_gemini_response(
-            "You are an expert at comparative analysis of academic papers.",
-            prompt,
+            "Identify key similarities, differences, methodologies, and findings:\n\n",
+            papers, retrieved_chunks, include_authors=True,
         )
+        return await get_gemini_response(COMPARE_SYSTEM_PROMPT, prompt)
 
-    def extract_key_findings(self, papers, retrieved_chunks: dict[int, list[str]] | None = None) -> str:
+    async def extract_key_findings(self, papers, retrieved_chunks: dict[int, list[str]] | None = None) -> str:
         """Extract key findings across multiple papers.
         Uses vector-retrieved chunks when available for deeper analysis."""
-        descriptions = []
-        for p in papers:
-            desc = f"- Title: {p.title}\n  Abstract: {p.abstract or 'N/A'}"
-            if retrieved_chunks and p.id in retrieved_chunks:
-                chunks = retrieved_chunks[p.id]
-                desc += "\n  Relevant Content:\n  " + "\n  ".join(chunks)
-            elif p.content:
-                desc += f"\n  Full Content:\n  {p.content}"
-            descriptions.append(desc)
-        prompt = (
-            "Extract and list the key findings from these research papers:\n\n"
-            + "\n\n".join(descriptions)
-        )
-        return get_gemini_response(
-            "You are an expert at extracting key findings from academic research.",
-            prompt,
+        prompt = self._describe_papers(
+            "Extract and list the key findings from these research papers:\n\n",
+            papers, retrieved_chunks, include_authors=False,
         )
+        return await get_gemini_response(FINDINGS_SYSTEM_PROMPT, prompt)
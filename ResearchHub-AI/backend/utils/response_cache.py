@@ -0,0 +1,44 @@
+"""
+Bounded response cache for LLM clients.
+
+An LRU with per-entry TTL: at most `maxsize` entries are kept (least recently
+used evicted first) and entries older than `ttl` seconds are dropped on access.
+Very large responses are not cached at all so a few huge prompts can't pin memory.
+"""
+
+import time
+from collections import OrderedDict
+
+
+class TTLLRUCache:
+    """In-memory LRU cache whose entries also expire after `ttl` seconds."""
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 600, max_value_chars: int = 50_000):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.max_value_chars = max_value_chars
+        self._data: OrderedDict[str | bytes, tuple[str, float]] = OrderedDict()  # key → (value, stored_at)
+
+    def get(self, key: str | bytes) -> str | None:
+        """Return the cached value, or None if missing or expired."""
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        value, stored_at = entry
+        if time.monotonic() - stored_at >= self.ttl:
+            del self._data[key]  # expired
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: str | bytes, value: str):
+        """Store a value, evicting the least recently used entries beyond maxsize."""
+        if value is None or len(value) > self.max_value_chars:
+            return
+        self._data[key] = (value, time.monotonic())
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._data)
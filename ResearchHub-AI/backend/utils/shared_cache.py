@@ -0,0 +1,185 @@
+"""
+Process-wide shared state for the LLM clients, backed by SQLite.
+
+Every uvicorn worker on the host opens the same database file, so:
+  - a response cached by one worker (or one provider client) is a hit for all
+  - the requests-per-minute window is counted across all workers, instead of
+    each worker believing it has the whole quota to itself
+
+A small in-memory LRU sits in front of the SQLite cache so hot keys never
+touch disk. All statements are single-row, indexed lookups on a local file.
+Async callers use aget / aset / areserve_request, which run the SQLite work in
+a worker thread so a locked database never stalls the event loop.
+"""
+
+import os
+import asyncio
+import sqlite3
+import threading
+import time
+
+from dotenv import load_dotenv
+
+from utils.response_cache import TTLLRUCache
+
+load_dotenv()
+
+# Anchored to the backend directory (not the CWD) so every worker shares one file
+SHARED_CACHE_PATH = os.getenv(
+    "LLM_SHARED_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), "llm_cache.sqlite3"),
+)
+SHARED_CACHE_MAX_ROWS = int(os.getenv("LLM_SHARED_CACHE_MAX_ROWS", "20000"))
+_WINDOW_SECONDS = 60.0
+_PURGE_EVERY = 200  # purge expired / excess cache rows every N writes
+_BUSY_TIMEOUT = 0.5  # seconds to wait on another worker's write lock before giving up
+
+
+class SharedCache:
+    """SQLite-backed response cache + sliding-window request counter shared across processes."""
+
+    def __init__(
+        self,
+        path: str,
+        ttl: float = 600,
+        memory_maxsize: int = 256,
+        max_value_chars: int = 50_000,
+        max_rows: int = 20000,
+    ):
+        self.path = path
+        self.ttl = ttl
+        self.max_rows = max_rows  # bounds the file size: oldest entries beyond this are trimmed
+        self.max_value_chars = max_value_chars
+        self._memory = TTLLRUCache(maxsize=memory_maxsize, ttl=ttl, max_value_chars=max_value_chars)
+        self._local = threading.local()  # one sqlite connection per thread, opened on first use
+        self._writes = 0
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=_BUSY_TIMEOUT, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._init_schema(conn)
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _init_schema(conn: sqlite3.Connection):
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "  key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS request_log (name TEXT NOT NULL, ts REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_request_log ON request_log (name, ts)")
+
+    # ── Response cache ──
+
+    def get(self, key: str) -> str | None:
+        """Return a cached response (memory first, then SQLite), or None."""
+        value = self._memory.get(key)
+        if value is not None:
+            return value
+        value = self._read(key)
+        if value is not None:
+            self._memory.set(key, value)
+        return value
+
+    async def aget(self, key: str) -> str | None:
+        """Async get: memory hits return immediately, the SQLite read runs in a thread."""
+        value = self._memory.get(key)
+        if value is not None:
+            return value
+        value = await asyncio.to_thread(self._read, key)
+        if value is not None:
+            self._memory.set(key, value)
+        return value
+
+    def set(self, key: str, value: str):
+        """Store a response for `ttl` seconds in both tiers."""
+        if value is None or len(value) > self.max_value_chars:
+            return
+        self._memory.set(key, value)
+        self._write(key, value)
+
+    async def aset(self, key: str, value: str):
+        """Async set: the SQLite write (and periodic purge) runs in a thread."""
+        if value is None or len(value) > self.max_value_chars:
+            return
+        self._memory.set(key, value)
+        await asyncio.to_thread(self._write, key, value)
+
+    def _read(self, key: str) -> str | None:
+        try:
+            row = self._conn().execute(
+                "SELECT value FROM responses WHERE key = ? AND expires_at > ?",
+                (key, time.time()),
+            ).fetchone()
+        except sqlite3.Error as e:
+            print(f"[SHARED CACHE] Read failed: {e}")
+            return None
+        return row[0] if row else None
+
+    def _write(self, key: str, value: str):
+        now = time.time()
+        try:
+            conn = self._conn()
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, value, now + self.ttl),
+            )
+            self._writes += 1
+            if self._writes % _PURGE_EVERY == 0:
+                conn.execute("DELETE FROM responses WHERE expires_at <= ?", (now,))
+                conn.execute(
+                    "DELETE FROM responses WHERE rowid IN ("
+                    "  SELECT rowid FROM responses ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+                    (self.max_rows,),
+                )
+        except sqlite3.Error as e:
+            print(f"[SHARED CACHE] Write failed: {e}")
+
+    # ── Shared rate window ──
+
+    def reserve_request(self, name: str, rpm: int) -> float:
+        """Atomically record a request under `name` if fewer than `rpm` happened in the last minute.
+
+        Returns 0.0 if the request was recorded, otherwise the seconds until a slot frees up.
+        Fails open (returns 0.0) if the database is unavailable.
+        """
+        now = time.time()
+        try:
+            conn = self._conn()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute(
+                    "DELETE FROM request_log WHERE name = ? AND ts <= ?",
+                    (name, now - _WINDOW_SECONDS),
+                )
+                count, oldest = conn.execute(
+                    "SELECT COUNT(*), MIN(ts) FROM request_log WHERE name = ?", (name,)
+                ).fetchone()
+                if count >= rpm:
+                    conn.execute("COMMIT")
+                    return max(0.0, oldest + _WINDOW_SECONDS - now)
+                conn.execute("INSERT INTO request_log (name, ts) VALUES (?, ?)", (name, now))
+                conn.execute("COMMIT")
+                return 0.0
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        except sqlite3.Error as e:
+            print(f"[SHARED CACHE] Rate window unavailable, not enforcing: {e}")
+            return 0.0
+
+    async def areserve_request(self, name: str, rpm: int) -> float:
+        """Async reserve_request; the SQLite transaction runs in a thread."""
+        return await asyncio.to_thread(self.reserve_request, name, rpm)
+
+
+_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL", "600"))  # seconds; default 10 minutes
+
+# Single instance shared by every LLM client in this process
+shared_cache = SharedCache(SHARED_CACHE_PATH, ttl=_CACHE_TTL, max_rows=SHARED_CACHE_MAX_ROWS)
@@ -4,6 +4,15 @@ Stores chunked PDF content as vector embeddings for semantic retrieval.
 """
 
 import os
+import re
+import asyncio
+import hashlib
+import functools
+import multiprocessing
+from bisect import bisect_right
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
 import chromadb
 from chromadb.utils import embedding_functions
 from dotenv import load_dotenv
@@ -11,39 +20,115 @@ from dotenv import load_dotenv
 load_dotenv()
 
 CHROMA_PERSIST_DIR = os.getenv("CHROMA_PERSIST_DIR", "./chroma_data")
-COLLECTION_NAME = "research_papers"
+# When set, talk to a standalone Chroma server (`chroma run`) instead of the
+# embedded store, so HNSW/SQLite work happens outside the API processes
+CHROMA_SERVER_HOST = os.getenv("CHROMA_SERVER_HOST", "")
+CHROMA_SERVER_PORT = int(os.getenv("CHROMA_SERVER_PORT", "8000"))
 CHUNK_SIZE = 500  # characters per chunk
 CHUNK_OVERLAP = 50  # overlap between chunks
 
+# Embedding model: all-MiniLM-L6-v2, run through ONNX Runtime by default (~2-3x
+# faster on CPU than PyTorch). EMBEDDING_BACKEND=torch restores the PyTorch path;
+# EMBEDDING_ONNX_FILE picks a pre-optimized/quantized export from the model repo
+# (e.g. onnx/model_qint8_avx512.onnx), EMBEDDING_ONNX_PROVIDER the ORT provider.
+# EMBEDDING_MODEL=static switches to a Model2Vec static embedding: a token lookup
+# plus mean pool, far faster to encode at some cost in retrieval quality.
+DEFAULT_EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+STATIC_EMBEDDING_MODEL = "minishlab/M2V_base_output"
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", DEFAULT_EMBEDDING_MODEL)
+if EMBEDDING_MODEL == "static":
+    EMBEDDING_MODEL = STATIC_EMBEDDING_MODEL
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "onnx").lower()
+EMBEDDING_ONNX_FILE = os.getenv("EMBEDDING_ONNX_FILE", "")
+EMBEDDING_ONNX_PROVIDER = os.getenv("EMBEDDING_ONNX_PROVIDER", "CPUExecutionProvider")
+
+# Optional worker processes for ingestion embedding, so CPU-bound encoding doesn't
+# serialize on the GIL. Each worker loads its own model copy (per uvicorn worker),
+# so this is opt-in; 0 = embed in-process on a thread
+EMBED_WORKERS = int(os.getenv("EMBED_WORKERS", "0"))
+# Chunk embeddings kept in memory (LRU, keyed by a hash of the chunk text) so
+# re-uploading or re-processing a paper skips the model; ~1.5 KB each at 384 dims
+EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", "50000"))
+
+# Vectors from different models can't share an index (dimensions differ), so
+# non-default models get their own collection; papers are re-embedded into it
+# on their next upload
+COLLECTION_NAME = "research_papers"
+if EMBEDDING_MODEL != DEFAULT_EMBEDDING_MODEL:
+    COLLECTION_NAME += "_" + re.sub(r"[^A-Za-z0-9]+", "_", EMBEDDING_MODEL.split("/")[-1]).strip("_").lower()
+
+# HNSW index settings, applied when the collection is first created (Chroma keeps
+# an existing collection's settings). Embeddings are L2-normalized, so inner
+# product ranks exactly like cosine while skipping the norm computations.
+# batch_size / sync_threshold (defaults 100 / 1000) are raised so a paper's
+# upsert lands in the graph in one batch and the index file is rewritten every
+# ~10 papers rather than every paper; the SQLite log keeps writes durable meanwhile.
+HNSW_METADATA = {
+    "hnsw:space": "ip",
+    "hnsw:construction_ef": 100,
+    "hnsw:M": 16,
+    "hnsw:search_ef": 64,
+    "hnsw:batch_size": 1000,
+    "hnsw:sync_threshold": 10000,
+}
+
 # Lazy-initialized globals
 _client: chromadb.ClientAPI | None = None
 _collection: chromadb.Collection | None = None
 _embedding_fn = None
+_embed_pool: ProcessPoolExecutor | None = None
+_max_batch_size = 1000  # replaced by the client's limit in init_vector_store
+_chunk_embedding_cache: OrderedDict[bytes, object] = OrderedDict()
 
 
 def _get_embedding_fn():
-    """Get or create the sentence-transformers embedding function."""
+    """Get or create the sentence-transformers embedding function.
+    Uses the ONNX backend when available, falling back to PyTorch. Static
+    (Model2Vec) models have no transformer to export, so they skip ONNX.
+    Output vectors are unit length (see HNSW_METADATA)."""
     global _embedding_fn
     if _embedding_fn is None:
-        _embedding_fn = embedding_functions.SentenceTransformerEmbeddingFunction(
-            model_name="all-MiniLM-L6-v2"
-        )
+        if EMBEDDING_BACKEND == "onnx" and EMBEDDING_MODEL != STATIC_EMBEDDING_MODEL:
+            model_kwargs = {"provider": EMBEDDING_ONNX_PROVIDER}
+            if EMBEDDING_ONNX_FILE:
+                model_kwargs["file_name"] = EMBEDDING_ONNX_FILE
+            try:
+                _embedding_fn = embedding_functions.SentenceTransformerEmbeddingFunction(
+                    model_name=EMBEDDING_MODEL,
+                    normalize_embeddings=True,
+                    backend="onnx",
+                    model_kwargs=model_kwargs,
+                )
+                print(f"[VECTOR STORE] Embedding model loaded with ONNX Runtime ({EMBEDDING_ONNX_PROVIDER})")
+            except Exception as e:
+                print(f"[VECTOR STORE] ONNX backend unavailable, using PyTorch: {e}")
+        if _embedding_fn is None:
+            _embedding_fn = embedding_functions.SentenceTransformerEmbeddingFunction(
+                model_name=EMBEDDING_MODEL,
+                normalize_embeddings=True,
+            )
     return _embedding_fn
 
 
 def init_vector_store():
-    """Initialize ChromaDB persistent client and collection.
+    """Initialize the ChromaDB client (embedded, or HTTP when CHROMA_SERVER_HOST
+    is set) and collection.
     Called lazily on first use — NOT at startup to avoid blocking the event loop."""
-    global _client, _collection
+    global _client, _collection, _max_batch_size
     if _collection is not None:
         return  # already initialized
-    print(f"[VECTOR STORE] Initializing ChromaDB at {CHROMA_PERSIST_DIR}")
-    _client = chromadb.PersistentClient(path=CHROMA_PERSIST_DIR)
+    if CHROMA_SERVER_HOST:
+        print(f"[VECTOR STORE] Connecting to ChromaDB server at {CHROMA_SERVER_HOST}:{CHROMA_SERVER_PORT}")
+        _client = chromadb.HttpClient(host=CHROMA_SERVER_HOST, port=CHROMA_SERVER_PORT)
+    else:
+        print(f"[VECTOR STORE] Initializing ChromaDB at {CHROMA_PERSIST_DIR}")
+        _client = chromadb.PersistentClient(path=CHROMA_PERSIST_DIR)
+    _max_batch_size = _client.get_max_batch_size()
     print(f"[VECTOR STORE] Loading embedding model (first call may take a moment)...")
     _collection = _client.get_or_create_collection(
         name=COLLECTION_NAME,
         embedding_function=_get_embedding_fn(),
-        metadata={"hnsw:space": "cosine"},
+        metadata=HNSW_METADATA,
     )
     count = _collection.count()
     print(f"[VECTOR STORE] Collection '{COLLECTION_NAME}' ready — {count} chunks stored")
@@ -57,11 +142,19 @@ def _get_collection() -> chromadb.Collection:
     return _collection
 
 
+_SENTENCE_END_RE = re.compile(r"\. ")
+
+
 def _chunk_text(text: str) -> list[str]:
     """Split text into overlapping chunks of ~CHUNK_SIZE characters."""
     if not text or not text.strip():
         return []
 
+    # Candidate break points, found in one C-level pass each; per chunk a bisect
+    # then finds the last one inside the window instead of two rfind scans
+    periods = [m.start() for m in _SENTENCE_END_RE.finditer(text)]
+    newlines = [m.start() for m in re.finditer("\n", text)]
+
     chunks = []
     start = 0
     text_len = len(text)
@@ -73,8 +166,10 @@ def _chunk_text(text: str) -> list[str]:
         if end < text_len:
             # Look for a good break point in the last 100 chars of the chunk
             search_start = max(end - 100, start)
-            last_period = text.rfind('. ', search_start, end)
-            last_newline = text.rfind('\n', search_start, end)
+            i = bisect_right(periods, end - 2) - 1  # ". " must end within the window
+            last_period = periods[i] if i >= 0 and periods[i] >= search_start else -1
+            i = bisect_right(newlines, end - 1) - 1
+            last_newline = newlines[i] if i >= 0 and newlines[i] >= search_start else -1
             break_point = max(last_period, last_newline)
             if break_point > start:
                 end = break_point + 1  # include the period/newline
@@ -89,44 +184,160 @@ def _chunk_text(text: str) -> list[str]:
     return chunks
 
 
-def add_paper(paper_id: int, text: str) -> int:
-    """Chunk and embed a paper's text content into ChromaDB.
-    Uses upsert so re-uploads overwrite existing chunks atomically.
-    Returns the number of chunks created."""
-    collection = _get_collection()
+@functools.lru_cache(maxsize=1024)
+def _embed_query(query: str):
+    """Embedding for a query string, cached so multi-paper lookups and repeated
+    chat questions run the model once per distinct query."""
+    return _get_embedding_fn()([query])[0]
 
-    chunks = _chunk_text(text)
-    if not chunks:
-        print(f"[VECTOR STORE] Paper {paper_id}: no text to embed")
-        return 0
 
-    # Remove any excess old chunks beyond the new count (handles re-upload
-    # where the new PDF has fewer chunks than the old one)
-    try:
-        existing = collection.get(where={"paper_id": paper_id})
-        old_ids = set(existing["ids"])
-        new_ids = {f"paper_{paper_id}_chunk_{i}" for i in range(len(chunks))}
-        stale_ids = list(old_ids - new_ids)
-        if stale_ids:
-            collection.delete(ids=stale_ids)
-    except Exception:
-        pass  # no existing chunks — fine
+def _embed_chunks(chunks: list[str]):
+    """Encode chunks with this process's embedding model (runs inside pool workers,
+    each of which lazily loads its own model once)."""
+    return _get_embedding_fn()(chunks)
 
-    ids = [f"paper_{paper_id}_chunk_{i}" for i in range(len(chunks))]
-    metadatas = [{"paper_id": paper_id, "chunk_index": i} for i in range(len(chunks))]
 
-    # ChromaDB batch limit — process in batches of 100
-    batch_size = 100
-    for batch_start in range(0, len(chunks), batch_size):
-        batch_end = min(batch_start + batch_size, len(chunks))
+def _get_embed_pool() -> ProcessPoolExecutor:
+    """Get or create the embedding process pool (spawned, not forked — the parent
+    has live threads and sockets that mustn't be copied into children)."""
+    global _embed_pool
+    if _embed_pool is None:
+        _embed_pool = ProcessPoolExecutor(
+            max_workers=EMBED_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _embed_pool
+
+
+def shutdown_embed_pool():
+    """Stop the embedding worker processes (called on app shutdown)."""
+    global _embed_pool
+    if _embed_pool is not None:
+        _embed_pool.shutdown(wait=False, cancel_futures=True)
+        _embed_pool = None
+
+
+async def _embed(chunks: list[str]):
+    """Embed chunks off the event loop — in the process pool, or a thread if disabled."""
+    if EMBED_WORKERS <= 0:
+        return await asyncio.to_thread(_embed_chunks, chunks)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_embed_pool(), _embed_chunks, chunks)
+
+
+async def _embed_cached(chunks: list[str]) -> list:
+    """Embeddings for chunks, reusing cached ones and embedding only the misses.
+    Runs on the event loop thread only, so the cache needs no lock."""
+    keys = [hashlib.blake2b(c.encode(), digest_size=16).digest() for c in chunks]
+    embeddings = []
+    for key in keys:
+        emb = _chunk_embedding_cache.get(key)
+        if emb is not None:
+            _chunk_embedding_cache.move_to_end(key)
+        embeddings.append(emb)
+
+    misses = [i for i, emb in enumerate(embeddings) if emb is None]
+    if misses:
+        fresh = await _embed([chunks[i] for i in misses])
+        for i, emb in zip(misses, fresh):
+            embeddings[i] = emb
+            if EMBEDDING_CACHE_SIZE > 0:
+                _chunk_embedding_cache[keys[i]] = emb
+        while len(_chunk_embedding_cache) > EMBEDDING_CACHE_SIZE:
+            _chunk_embedding_cache.popitem(last=False)
+    return embeddings
+
+
+def _chunk_records(paper_id: int, count: int) -> tuple[list[str], list[dict]]:
+    """Chunk ids and metadatas for a paper, built in one pass.
+    Ids are fixed width: 8 hex digits of paper id + 8 of chunk index."""
+    prefix = f"{paper_id:08x}"
+    ids: list[str] = []
+    metadatas: list[dict] = []
+    add_id, add_meta = ids.append, metadatas.append
+    for i in range(count):
+        add_id(f"{prefix}{i:08x}")
+        add_meta({"paper_id": paper_id, "chunk_index": i})
+    return ids, metadatas
+
+
+def _store_chunks(papers: list[tuple[int, list[str]]], embeddings) -> None:
+    """Write papers' chunks + precomputed embeddings (in `papers` order), dropping
+    stale chunks from a previous (longer) version of each paper.
+    Blocking Chroma I/O — call via a thread."""
+    collection = _get_collection()
+
+    ids: list[str] = []
+    metadatas: list[dict] = []
+    documents: list[str] = []
+    for paper_id, chunks in papers:
+        paper_ids, paper_metadatas = _chunk_records(paper_id, len(chunks))
+
+        # Remove any excess old chunks beyond the new count (handles re-upload
+        # where the new PDF has fewer chunks than the old one, and chunks stored
+        # under the old "paper_{id}_chunk_{i}" id format)
+        try:
+            existing = collection.get(where={"paper_id": paper_id}, include=[])  # ids only
+            stale_ids = list(set(existing["ids"]).difference(paper_ids))
+            if stale_ids:
+                collection.delete(ids=stale_ids)
+        except Exception:
+            pass  # no existing chunks — fine
+
+        ids.extend(paper_ids)
+        metadatas.extend(paper_metadatas)
+        documents.extend(chunks)
+
+    # Everything goes in one upsert without being re-sliced, unless it exceeds
+    # Chroma's max batch size (~5k chunks)
+    batch_size = _max_batch_size
+    if len(ids) <= batch_size:
+        collection.upsert(ids=ids, documents=documents, metadatas=metadatas, embeddings=embeddings)
+        return
+    for batch_start in range(0, len(ids), batch_size):
+        batch_end = batch_start + batch_size
         collection.upsert(
             ids=ids[batch_start:batch_end],
-            documents=chunks[batch_start:batch_end],
+            documents=documents[batch_start:batch_end],
             metadatas=metadatas[batch_start:batch_end],
+            embeddings=embeddings[batch_start:batch_end],
         )
 
-    print(f"[VECTOR STORE] Paper {paper_id}: embedded {len(chunks)} chunks ({len(text)} chars)")
-    return len(chunks)
+
+async def add_papers(items: list[tuple[int, str]]) -> dict[int, int]:
+    """Chunk and embed several papers' text into ChromaDB in one go.
+    All papers' chunks are embedded in a single encode call and written with as
+    few upserts as possible. Returns a dict mapping paper_id → chunks created."""
+    counts: dict[int, int] = {}
+    papers: list[tuple[int, list[str]]] = []
+    all_chunks: list[str] = []
+    for paper_id, text in items:
+        chunks = _chunk_text(text)
+        counts[paper_id] = len(chunks)
+        if not chunks:
+            print(f"[VECTOR STORE] Paper {paper_id}: no text to embed")
+            continue
+        papers.append((paper_id, chunks))
+        all_chunks.extend(chunks)
+    if not papers:
+        return counts
+
+    # Embed every uncached chunk in one encode call (the model batches internally)
+    # instead of letting Chroma embed each upsert batch separately
+    embeddings = await _embed_cached(all_chunks)
+    await asyncio.to_thread(_store_chunks, papers, embeddings)
+
+    for paper_id, chunks in papers:
+        print(f"[VECTOR STORE] Paper {paper_id}: embedded {len(chunks)} chunks")
+    return counts
+
+
+async def add_paper(paper_id: int, text: str) -> int:
+    """Chunk and embed a paper's text content into ChromaDB.
+    Uses upsert so re-uploads overwrite existing chunks atomically.
+    Returns the number of chunks created."""
+    counts = await add_papers([(paper_id, text)])
+    return counts[paper_id]
 
 
 def query_paper(paper_id: int, query: str, n_results: int = 5) -> list[str]:
@@ -135,14 +346,11 @@ def query_paper(paper_id: int, query: str, n_results: int = 5) -> list[str]:
     collection = _get_collection()
 
     try:
-        # Clamp n_results to available chunk count to avoid ChromaDB errors
-        available = collection.count()
-        if available == 0:
-            return []
-        safe_n = min(n_results, available)
+        # No count() preflight: Chroma returns fewer than n_results when the
+        # filter matches fewer chunks, and an empty collection just yields []
         results = collection.query(
-            query_texts=[query],
-            n_results=safe_n,
+            query_embeddings=[_embed_query(query)],
+            n_results=n_results,
             where={"paper_id": paper_id},
         )
     except Exception as e:
@@ -153,9 +361,10 @@ def query_paper(paper_id: int, query: str, n_results: int = 5) -> list[str]:
     return documents
 
 
-def query_papers(paper_ids: list[int], query: str, n_results: int = 5) -> dict[int, list[str]]:
+async def query_papers(paper_ids: list[int], query: str, n_results: int = 5) -> dict[int, list[str]]:
     """Retrieve relevant chunks across multiple papers.
-    Uses a single query with $in filter for efficiency.
+    Uses a single query with $in filter for efficiency; the blocking Chroma
+    calls run in a worker thread so the event loop stays free.
     Returns a dict mapping paper_id → list of relevant chunks."""
     if not paper_ids:
         return {}
@@ -164,14 +373,12 @@ def query_papers(paper_ids: list[int], query: str, n_results: int = 5) -> dict[i
     result_map: dict[int, list[str]] = {}
 
     try:
-        total = collection.count()
-        if total == 0:
-            return {}
+        query_embedding = await asyncio.to_thread(_embed_query, query)
         # Single query with $in filter instead of N separate queries
-        safe_n = min(n_results * len(paper_ids), total)
-        results = collection.query(
-            query_texts=[query],
-            n_results=safe_n,
+        results = await asyncio.to_thread(
+            collection.query,
+            query_embeddings=[query_embedding],
+            n_results=n_results * len(paper_ids),
             where={"paper_id": {"$in": paper_ids}},
         )
         docs = results.get("documents", [[]])[0]
@@ -185,49 +392,48 @@ def query_papers(paper_ids: list[int], query: str, n_results: int = 5) -> dict[i
             result_map[pid] = result_map[pid][:n_results]
     except Exception as e:
         print(f"[VECTOR STORE] Batch query failed, falling back to per-paper: {e}")
-        # Fallback: query one paper at a time
-        for pid in paper_ids:
-            try:
-                chunk_count = collection.count()
-                if chunk_count == 0:
-                    continue
-                safe_n = min(n_results, chunk_count)
-                results = collection.query(
-                    query_texts=[query],
-                    n_results=safe_n,
-                    where={"paper_id": pid},
-                )
-                docs = results.get("documents", [[]])[0]
-                if docs:
-                    result_map[pid] = docs
-            except Exception as inner_e:
-                print(f"[VECTOR STORE] Query failed for paper {pid}: {inner_e}")
+        # Fallback: one query per paper, run concurrently
+        result_map = await query_papers_parallel(paper_ids, query, n_results)
 
     return result_map
 
 
-def delete_paper(paper_id: int):
-    """Remove all chunks for a paper from ChromaDB."""
+async def query_papers_parallel(paper_ids: list[int], query: str, n_results: int = 5) -> dict[int, list[str]]:
+    """Retrieve relevant chunks for each paper concurrently.
+    Runs one query_paper per paper in the default thread pool so the
+    CPU-bound HNSW searches overlap and the event loop stays free.
+    Returns a dict mapping paper_id → list of relevant chunks."""
+    if not paper_ids:
+        return {}
+
+    await asyncio.to_thread(_embed_query, query)  # embed once; the per-paper threads hit the cache
+    results = await asyncio.gather(
+        *(asyncio.to_thread(query_paper, pid, query, n_results) for pid in paper_ids)
+    )
+    return {pid: docs for pid, docs in zip(paper_ids, results) if docs}
+
+
+async def delete_paper(paper_id: int):
+    """Remove all chunks for a paper from ChromaDB (Chroma I/O runs in a thread)."""
     collection = _get_collection()
     try:
-        # Get all chunk IDs for this paper
-        existing = collection.get(
-            where={"paper_id": paper_id},
+        # Get all chunk IDs for this paper (ids only — no documents/metadatas)
+        existing = await asyncio.to_thread(
+            collection.get, where={"paper_id": paper_id}, include=[]
         )
         if existing["ids"]:
-            collection.delete(ids=existing["ids"])
+            await asyncio.to_thread(collection.delete, ids=existing["ids"])
             print(f"[VECTOR STORE] Paper {paper_id}: deleted {len(existing['ids'])} chunks")
     except Exception as e:
         print(f"[VECTOR STORE] Delete failed for paper {paper_id}: {e}")
 
 
-def has_embeddings(paper_id: int) -> bool:
+async def has_embeddings(paper_id: int) -> bool:
     """Check if a paper has any stored embeddings."""
     collection = _get_collection()
     try:
-        existing = collection.get(
-            where={"paper_id": paper_id},
-            limit=1,
+        existing = await asyncio.to_thread(
+            collection.get, where={"paper_id": paper_id}, limit=1, include=[]
         )
         return len(existing["ids"]) > 0
     except Exception:
@@ -238,21 +444,17 @@ def semantic_search_all(query: str, paper_ids: list[int], n_results: int = 50) -
     """Run a semantic search across all given paper IDs.
 
     Returns a dict mapping paper_id → best cosine similarity score (0-1, higher = better).
-    ChromaDB returns cosine *distance* (0-2 for cosine space); we convert to similarity.
+    ChromaDB returns a distance of 1 - cosine similarity (for both the "cosine" space and
+    "ip" on normalized vectors); we convert back to similarity.
     """
     if not paper_ids:
         return {}
 
     collection = _get_collection()
     try:
-        total = collection.count()
-        if total == 0:
-            return {}
-
-        safe_n = min(n_results, total)
         results = collection.query(
-            query_texts=[query],
-            n_results=safe_n,
+            query_embeddings=[_embed_query(query)],
+            n_results=n_results,
             where={"paper_id": {"$in": paper_ids}},
             include=["metadatas", "distances"],
         )
@@ -260,17 +462,20 @@ def semantic_search_all(query: str, paper_ids: list[int], n_results: int = 50) -
         distances = results.get("distances", [[]])[0]
         metas = results.get("metadatas", [[]])[0]
 
-        # Keep the best (lowest distance) per paper, convert to similarity
-        best_scores: dict[int, float] = {}
-        for dist, meta in zip(distances, metas):
-            pid = meta.get("paper_id")
-            if pid is None:
-                continue
-            similarity = max(0.0, 1.0 - dist)  # cosine distance → similarity
-            if pid not in best_scores or similarity > best_scores[pid]:
-                best_scores[pid] = similarity
-
-        return best_scores
+        # Keep the best (lowest distance) per paper in one scatter-min, then
+        # convert to similarity
+        pid_to_idx = {pid: i for i, pid in enumerate(paper_ids)}
+        idx = np.fromiter((pid_to_idx.get(m.get("paper_id"), -1) for m in metas), dtype=np.intp, count=len(metas))
+        dist_arr = np.asarray(distances, dtype=np.float64)
+        keep = idx >= 0
+        best = np.full(len(paper_ids), np.inf)
+        np.minimum.at(best, idx[keep], dist_arr[keep])
+
+        return {
+            pid: max(0.0, 1.0 - float(d))  # cosine distance → similarity
+            for pid, d in zip(paper_ids, best)
+            if np.isfinite(d)
+        }
     except Exception as e:
         print(f"[VECTOR STORE] Semantic search failed: {e}")
         return {}